@@ -1,7 +1,6 @@
 # app.py
 import streamlit as st
-from ui_helpers import top_nav, show_csv
-from oci_helpers import load_cloud_csv
+from ui_helpers import top_nav, show_csv, show_cloud_csv, clear_cloud_previews
 from prep_helpers import ensure_merged_in_cloud, SRC_FINAL, SRC_MAIN, SRC_REP, DST_MERGED
 
 st.set_page_config(page_title="NDIS Incident Insights", page_icon="📊", layout="wide")
@@ -14,8 +13,18 @@ st.title("NDIS Incident Insights — Home")
 
 with st.spinner("Merging the three data sources from Oracle Cloud..."):
     combined = ensure_merged_in_cloud()
+    if not combined.attrs.get("reused"):
+        clear_cloud_previews()
 
-st.success(f"Fresh merge saved as '{DST_MERGED}' in your bucket.")
+if combined.attrs.get("reused"):
+    st.success(f"Sources unchanged — reusing '{DST_MERGED}' from your bucket.")
+else:
+    st.success(f"Fresh merge saved as '{DST_MERGED}' in your bucket.")
+for j in combined.attrs.get("merge_report", []):
+    st.caption(
+        f"Join {j['source']} on {', '.join(j['on'])}: {j['rows_in']} → {j['rows_out']} rows "
+        f"(fan-out ×{j['fan_out']}, without de-duplication ≈ {j['estimated_rows']}, policy: {j['policy']})"
+    )
 st.subheader("Combined (top)")
 show_csv(combined.head(500), f"First 500 rows of {DST_MERGED}")
 
@@ -23,11 +32,11 @@ st.divider()
 st.subheader("Source tables (from Oracle Cloud)")
 col1, col2, col3 = st.columns([1,1,1])
 with col1:
-    show_csv(load_cloud_csv(SRC_FINAL), f"Cloud: {SRC_FINAL}")
+    show_cloud_csv(SRC_FINAL, f"Cloud: {SRC_FINAL}")
 with col2:
-    show_csv(load_cloud_csv(SRC_MAIN), f"Cloud: {SRC_MAIN}")
+    show_cloud_csv(SRC_MAIN, f"Cloud: {SRC_MAIN}")
 with col3:
-    show_csv(load_cloud_csv(SRC_REP), f"Cloud: {SRC_REP}")
+    show_cloud_csv(SRC_REP, f"Cloud: {SRC_REP}")
 
 st.divider()
 st.page_link("pages/1_Process.py", label="➡️ Process", use_container_width=True)
@@ -0,0 +1,186 @@
+# dedup_helpers.py
+"""
+Near-duplicate incident detection: the same event reported separately by several
+people. Descriptions are compared with MinHash signatures of character shingles
+and LSH banding, inside blocks of (client, date window), so the work stays close
+to linear in the number of rows instead of comparing every pair.
+"""
+import os
+import re
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+DUP_GROUP = "dup_group_id"
+
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))       # MinHash signature length
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))             # LSH bands (NUM_PERM / BANDS rows each)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.6"))  # min estimated Jaccard similarity
+DEDUP_WINDOW_DAYS = int(os.getenv("DEDUP_WINDOW_DAYS", "3"))  # max days between duplicate reports
+DEDUP_SHINGLE = int(os.getenv("DEDUP_SHINGLE", "5"))          # characters per shingle
+DEDUP_MIN_CHARS = int(os.getenv("DEDUP_MIN_CHARS", "20"))     # shorter descriptions are never duplicates
+DEDUP_MAX_BUCKET = int(os.getenv("DEDUP_MAX_BUCKET", "50"))   # larger LSH buckets only pair neighbours
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, DEDUP_NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, DEDUP_NUM_PERM, dtype=np.uint64)
+NON_WORD = re.compile(r"[^0-9a-z]+")  # also used by entity_helpers
+
+
+# ---------- signatures ----------
+def _normalize(text: str) -> str:
+    return NON_WORD.sub(" ", text.lower()).strip()
+
+
+def _signature(text: str, k: int = DEDUP_SHINGLE) -> np.ndarray:
+    shingles = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles), dtype=np.uint64)
+    return ((np.outer(x, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def minhash_signatures(texts) -> np.ndarray:
+    """(len(texts), DEDUP_NUM_PERM) MinHash signatures of normalized texts."""
+    out = np.zeros((len(texts), DEDUP_NUM_PERM), dtype=np.uint32)
+    for i, t in enumerate(texts):
+        out[i] = _signature(t)
+    return out
+
+
+def _band_hashes(sigs: np.ndarray, bands: int = DEDUP_BANDS) -> np.ndarray:
+    """(n, bands) uint64 hash of each band of each signature."""
+    rows = sigs.shape[1] // bands
+    coefs = (np.uint64(1_000_003) ** np.arange(rows, dtype=np.uint64)).astype(np.uint64)
+    banded = sigs[:, :rows * bands].astype(np.uint64).reshape(len(sigs), bands, rows)
+    return (banded * coefs).sum(axis=2)
+
+
+# ---------- grouping ----------
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def components(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Union-find over (m, 2) index pairs: for each of n items, the smallest index in its component."""
+    parent = np.arange(n)
+    for a, b in pairs:
+        ra, rb = _find(parent, a), _find(parent, b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    return np.array([_find(parent, i) for i in range(n)])
+
+
+def _bucket_pairs(rows: np.ndarray, bucket: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """(m, 2) pairs of rows that fall into the same bucket; only buckets of 2+ rows are visited."""
+    sizes = np.bincount(bucket)
+    keep = sizes[bucket] >= 2
+    rows, bucket = rows[keep], bucket[keep]
+    if not len(rows):
+        return np.empty((0, 2), dtype=np.int64)
+    order = np.argsort(bucket, kind="stable")
+    rows, bucket = rows[order], bucket[order]
+    cuts = np.flatnonzero(np.diff(bucket)) + 1
+    pairs = []
+    for members in np.split(rows, cuts):
+        members = np.unique(members)
+        if len(members) < 2:
+            continue
+        if len(members) > DEDUP_MAX_BUCKET:
+            # boilerplate text: chain neighbours in date order instead of all pairs
+            members = members[np.argsort(days[members], kind="stable")]
+            pairs.append(np.column_stack([members[:-1], members[1:]]))
+        else:
+            i, j = np.triu_indices(len(members), k=1)
+            pairs.append(np.column_stack([members[i], members[j]]))
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+
+def _candidate_pairs(rows: np.ndarray, block: np.ndarray, dkey: np.ndarray,
+                     bh: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """
+    (m, 2) row pairs sharing a (block, date key, band hash) bucket in any band.
+    Every dated row sits in its window bucket and the next one, so two rows less
+    than a window apart always share a date key.
+    """
+    rows2 = np.concatenate([rows, rows])
+    block2 = np.concatenate([block, block])
+    dkey2 = np.concatenate([dkey, np.where(dkey >= 0, dkey + 1, -1)])
+    found = []
+    for band in range(bh.shape[1]):
+        h2 = np.concatenate([bh[:, band], bh[:, band]])
+        bucket = pd.DataFrame({"b": block2, "d": dkey2, "h": h2}).groupby(["b", "d", "h"], sort=False).ngroup()
+        found.append(_bucket_pairs(rows2, bucket.to_numpy(), days))
+    allp = np.concatenate(found)
+    if not len(allp):
+        return allp
+    return np.unique(np.sort(allp, axis=1), axis=0)
+
+
+def near_duplicate_groups(df: pd.DataFrame, ids: pd.Series, text_col: str = "description",
+                          block_col: str = "client_name", date_col: str = "incident_dt",
+                          threshold: float = DEDUP_THRESHOLD, window_days: int = DEDUP_WINDOW_DAYS) -> pd.Series:
+    """
+    Group id per row: rows describing the same event share the id of the group's
+    earliest report (from `ids`); every other row keeps its own id.
+
+    Two rows are duplicates when they have the same `block_col`, happened at most
+    `window_days` apart (or both have no date) and their descriptions have an
+    estimated Jaccard similarity of at least `threshold`. Groups are the connected
+    components of those pairs.
+    """
+    t0 = time.perf_counter()
+    n = len(df)
+    ids = ids.astype(str).reset_index(drop=True)
+    if n < 2 or text_col not in df.columns:
+        return pd.Series(ids.to_numpy(), index=df.index, dtype=object)
+
+    text = df[text_col].astype("string").fillna("").map(_normalize).to_numpy(dtype=object)
+    eligible = np.flatnonzero(np.fromiter((len(t) >= DEDUP_MIN_CHARS for t in text), dtype=bool, count=n))
+
+    dts = pd.to_datetime(df[date_col] if date_col in df.columns else pd.Series(pd.NaT, index=df.index),
+                         errors="coerce", utc=True)
+    dated = dts.notna().to_numpy()
+    days = np.full(n, -1, dtype=np.int64)
+    days[dated] = ((dts[dated] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(days=1)).to_numpy(np.int64)
+    block = (pd.factorize(df[block_col].astype("string").fillna(""))[0] if block_col in df.columns
+             else np.zeros(n, dtype=np.int64))
+
+    pairs = np.empty((0, 2), dtype=np.int64)
+    if len(eligible) >= 2:
+        # identical descriptions share one signature
+        codes, uniques = pd.factorize(pd.Series(text[eligible]))
+        sigs = np.zeros((n, DEDUP_NUM_PERM), dtype=np.uint32)
+        sigs[eligible] = minhash_signatures(list(uniques))[codes]
+        bh = _band_hashes(sigs[eligible])
+        dkey = np.where(dated[eligible], days[eligible] // max(window_days, 1), -1)
+        cand = _candidate_pairs(eligible, block[eligible], dkey, bh, days)
+        if len(cand):
+            a, b = cand[:, 0], cand[:, 1]
+            similar = (sigs[a] == sigs[b]).mean(axis=1) >= threshold
+            both_dated = dated[a] & dated[b]
+            near = np.where(both_dated, np.abs(days[a] - days[b]) <= window_days, ~dated[a] & ~dated[b])
+            pairs = cand[similar & near]
+
+    roots = components(n, pairs)
+
+    # the earliest report of each group names it
+    order = np.lexsort((np.arange(n), np.where(dated, days, np.iinfo(np.int64).max)))
+    first = pd.Series(order, index=roots[order]).groupby(level=0).first()
+    rep = first.reindex(roots).to_numpy()
+    groups = pd.Series(ids.to_numpy()[rep], index=df.index, dtype=object)
+
+    n_dup = int((rep != np.arange(n)).sum())
+    print(f"[dedup] {n} rows: {len(pairs)} near-duplicate pairs, {n_dup} rows folded into "
+          f"{len(np.unique(roots[rep != np.arange(n)]))} groups in {time.perf_counter() - t0:.2f} s")
+    return groups
+
+
+def dedup_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per near-duplicate group; df is returned unchanged without dup_group_id."""
+    if DUP_GROUP not in df.columns:
+        return df
+    return df.drop_duplicates(DUP_GROUP)
@@ -0,0 +1,218 @@
+# entity_helpers.py
+"""
+Entity resolution for client, organization and reporter names.
+
+Spelling variants ("John Smith", "SMITH, John", "Mr John Smith", "John Smithe";
+"Acme Care Pty Ltd", "ACME CARE") are mapped to one canonical name and a stable id
+before the sources are joined. Shorter forms of a name ("Jon Smith") score below the
+default ENTITY_THRESHOLD and stay separate entities. Names are only
+compared inside blocks that share a phonetic/prefix key, and every block is scored
+in one batch (hashed character-trigram vectors, a single matrix product), so the
+work grows with the block sizes instead of with the square of the number of names.
+The learned mapping is stored as entity_map.csv and reused: later runs only resolve
+names they have not seen before.
+"""
+import hashlib
+import os
+import time
+import zlib
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from dedup_helpers import NON_WORD, components
+from oci_helpers import load_cloud_csv, upload_cloud_csv, CSV_SCHEMAS, STRING_DTYPE
+from lease_helpers import lease_guard
+
+ENTITY_MAP = "entity_map.csv"
+ENTITY_COLUMNS = ["client_name", "organization", "reporter"]
+ENTITY_RESOLUTION = os.getenv("ENTITY_RESOLUTION", "on").lower() not in ("0", "off", "false", "no")
+ENTITY_THRESHOLD = float(os.getenv("ENTITY_THRESHOLD", "0.82"))   # min trigram cosine similarity
+ENTITY_MAX_BLOCK = int(os.getenv("ENTITY_MAX_BLOCK", "256"))      # larger blocks are scored in sorted windows
+ENTITY_DIMS = 1024                                                # hashed trigram vector size
+
+MAP_COLUMNS = ["entity", "variant", "canonical", "entity_id", "count"]
+CSV_SCHEMAS[ENTITY_MAP] = {c: STRING_DTYPE for c in MAP_COLUMNS if c != "count"}
+
+# words that do not tell two names apart
+_STOP = {
+    "organization": {"the", "pty", "ltd", "limited", "inc", "incorporated", "co", "company", "corp",
+                     "and", "of"},
+    "person": {"mr", "mrs", "ms", "miss", "dr", "prof", "jr", "sr"},
+}
+# generic words that do ("Acme Group" vs "Acme Services"): dropped for blocking only
+_GENERIC = {
+    "organization": {"group", "services", "service", "australia", "au"},
+    "person": set(),
+}
+
+
+# ---------- normalization and blocking ----------
+def normalize_name(value: str, entity: str = "client_name", blocking: bool = False) -> str:
+    """
+    Lower-case, punctuation-free, stop words removed; tokens sorted so word order does not matter.
+    With `blocking`, generic words are removed too; that form only picks the block, names are scored without it.
+    """
+    kind = "organization" if entity == "organization" else "person"
+    stop = _STOP[kind] | _GENERIC[kind] if blocking else _STOP[kind]
+    words = NON_WORD.sub(" ", str(value).lower()).split()
+    tokens = [t for t in words if t not in stop] or words
+    return " ".join(sorted(tokens))
+
+
+def soundex(word: str) -> str:
+    codes = {**dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+             "l": "4", **dict.fromkeys("mn", "5"), "r": "6"}
+    word = "".join(c for c in word.lower() if c.isalpha())
+    if not word:
+        return ""
+    out, last = word[0].upper(), codes.get(word[0], "")
+    for c in word[1:]:
+        code = codes.get(c, "")
+        if code and code != last:
+            out += code
+        if c not in "hw":
+            last = code
+    return (out + "000")[:4]
+
+
+def _block_keys(norm: str) -> Tuple[str, str]:
+    """Two keys per name, so one misspelled token still leaves a shared block."""
+    tokens = norm.split() or [""]
+    first, last = tokens[0], tokens[-1]
+    return f"{soundex(first)}|{last[:1]}", f"{soundex(last)}|{first[:1]}"
+
+
+# ---------- batched scoring ----------
+def _trigram_vectors(names: List[str]) -> np.ndarray:
+    """L2-normalized hashed character-trigram counts, one row per name."""
+    vecs = np.zeros((len(names), ENTITY_DIMS), dtype=np.float32)
+    for i, name in enumerate(names):
+        s = f"  {name} "
+        for j in range(len(s) - 2):
+            vecs[i, zlib.crc32(s[j:j + 3].encode("utf-8")) % ENTITY_DIMS] += 1
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs / np.where(norms == 0, 1, norms)
+
+
+def _windows(members: np.ndarray, norms: np.ndarray) -> List[np.ndarray]:
+    if len(members) <= ENTITY_MAX_BLOCK:
+        return [members]
+    # oversized block: sorted neighbourhood, half-overlapping windows
+    members = members[np.argsort(norms[members], kind="stable")]
+    step = ENTITY_MAX_BLOCK // 2
+    return [members[i:i + ENTITY_MAX_BLOCK] for i in range(0, len(members) - step, step)]
+
+
+def _similar_pairs(norms: np.ndarray, threshold: float, block_norms: Optional[List[str]] = None) -> np.ndarray:
+    """
+    (m, 2) index pairs of names sharing a block and scoring at least `threshold`.
+    Blocks come from `block_norms` (default: `norms`), scores always from `norms`.
+    """
+    keys = [_block_keys(n) for n in (norms if block_norms is None else block_norms)]
+    blocks = pd.Series(np.tile(np.arange(len(norms)), 2),
+                       index=[k[0] for k in keys] + [k[1] for k in keys])
+    pairs = []
+    for members in blocks.groupby(level=0).agg(list):
+        if len(members) < 2:
+            continue
+        for win in _windows(np.unique(members), norms):
+            vecs = _trigram_vectors(list(norms[win]))  # built per window: memory stays per block
+            sim = vecs @ vecs.T
+            i, j = np.nonzero(np.triu(sim >= threshold, k=1))
+            if len(i):
+                pairs.append(np.column_stack([win[i], win[j]]))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.sort(np.concatenate(pairs), axis=1), axis=0)
+
+
+def _new_id(entity: str, canonical: str) -> str:
+    return f"{entity[:3]}-" + hashlib.sha1(normalize_name(canonical, entity).encode("utf-8")).hexdigest()[:10]
+
+
+# ---------- resolution ----------
+def resolve_entity(entity: str, counts: pd.Series, known: Optional[pd.DataFrame] = None,
+                   threshold: float = ENTITY_THRESHOLD) -> pd.DataFrame:
+    """
+    Map raw names (`counts`: name -> rows) to canonical names and ids.
+
+    Names already in `known` (rows of the mapping table for this entity) keep
+    their id. New names are clustered together with the known canonical names:
+    a cluster that contains a known entity joins it, otherwise it becomes a new
+    entity named after its most frequent spelling. Returns rows of MAP_COLUMNS.
+    """
+    known = known if known is not None else pd.DataFrame(columns=MAP_COLUMNS)
+    seen = set(known["variant"])
+    new_names = [v for v in counts.index if v not in seen]
+    if not new_names:
+        return known
+
+    anchors = known.drop_duplicates("entity_id")[["canonical", "entity_id"]]
+    canonical_of = dict(zip(anchors["entity_id"], anchors["canonical"]))
+    names = new_names + anchors["canonical"].tolist()
+    anchor_ids = [None] * len(new_names) + anchors["entity_id"].tolist()
+    norms = [normalize_name(v, entity) for v in names]
+
+    # identical normalized names are one node
+    codes, uniq = pd.factorize(pd.Series(norms, dtype=object))
+    pairs = _similar_pairs(np.asarray(uniq, dtype=object), threshold,
+                           [normalize_name(u, entity, blocking=True) for u in uniq])
+    roots = components(len(uniq), pairs)[codes]
+
+    rows = []
+    for members in pd.Series(roots).groupby(roots).indices.values():
+        variants = [names[i] for i in members if i < len(new_names)]
+        if not variants:
+            continue
+        ids = [anchor_ids[i] for i in members if anchor_ids[i] is not None]
+        if ids:
+            entity_id = ids[0]
+            canonical = canonical_of[entity_id]
+        else:
+            canonical = max(variants, key=lambda v: (counts.get(v, 0), -len(v), v))
+            entity_id = _new_id(entity, canonical)
+        rows += [{"entity": entity, "variant": v, "canonical": canonical,
+                  "entity_id": entity_id, "count": int(counts.get(v, 0))} for v in variants]
+    return pd.concat([known, pd.DataFrame(rows, columns=MAP_COLUMNS)], ignore_index=True)
+
+
+def resolve_entities(frames: List[pd.DataFrame], columns: List[str] = ENTITY_COLUMNS,
+                     persist: bool = True) -> pd.DataFrame:
+    """
+    Canonicalize `columns` in every frame in place and add `<col>_id` columns.
+    Names are resolved across all frames together, so ids line up for joining.
+    The mapping table is read from and, when it grew, written back to entity_map.csv.
+    """
+    t0 = time.perf_counter()
+    table = load_cloud_csv(ENTITY_MAP, columns=MAP_COLUMNS)
+    size_before = len(table)
+    parts = []
+    for col in columns:
+        values = [f[col].dropna().astype(str).str.strip() for f in frames if col in f.columns]
+        if not values:
+            continue
+        counts = pd.concat(values).loc[lambda s: s != ""].value_counts()
+        parts.append(resolve_entity(col, counts, table[table["entity"] == col]))
+    others = table[~table["entity"].isin(columns)]
+    table = pd.concat([others] + parts, ignore_index=True) if parts else table
+
+    for col in columns:
+        m = table[table["entity"] == col].drop_duplicates("variant").set_index("variant")
+        for f in frames:
+            if col not in f.columns:
+                continue
+            raw = f[col].astype("string").str.strip()
+            f[f"{col}_id"] = raw.map(m["entity_id"]).astype(object)
+            f[col] = raw.map(m["canonical"]).fillna(f[col]).astype(object)
+
+    summary = {
+        col: (int((table["entity"] == col).sum()), int(table.loc[table["entity"] == col, "entity_id"].nunique()))
+        for col in columns
+    }
+    print("[entities] " + ", ".join(f"{c}: {v} spellings -> {e} entities" for c, (v, e) in summary.items())
+          + f" ({len(table) - size_before} new) in {time.perf_counter() - t0:.2f} s")
+    if persist and len(table) != size_before:
+        lease_guard()()  # the mapping is shared: a merge that lost its lease must not rewrite it
+        upload_cloud_csv(ENTITY_MAP, table[MAP_COLUMNS])
+    return table
@@ -0,0 +1,110 @@
+# figstore_helpers.py
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+FIG_STORE_MAX_BYTES = int(os.getenv("FIG_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class FigureStore:
+    """
+    Process-wide LRU store of rendered figures, bounded by total bytes.
+
+    Figures are kept serialized (Plotly -> JSON, matplotlib / PIL -> PNG), so
+    sessions only hold keys and memory no longer grows with the number of users.
+    Matplotlib figures are closed as soon as they are rasterized.
+    """
+
+    def __init__(self, max_bytes: int = FIG_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._groups: Dict[str, List[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def _serialize(fig) -> Tuple[str, bytes]:
+        if hasattr(fig, "to_plotly_json"):  # Plotly
+            return "plotly", fig.to_json().encode("utf-8")
+        buf = io.BytesIO()
+        if hasattr(fig, "savefig"):  # matplotlib
+            import matplotlib.pyplot as plt
+            fig.savefig(buf, format="png", bbox_inches="tight")
+            plt.close(fig)
+        elif hasattr(fig, "save"):  # PIL (word cloud)
+            fig.save(buf, format="PNG")
+            return "image", buf.getvalue()
+        else:
+            raise TypeError(f"Cannot store figure of type {type(fig).__name__}")
+        return "png", buf.getvalue()
+
+    def put(self, key: str, fig) -> str:
+        kind, data = self._serialize(fig)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._items[key] = (kind, data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+        return key
+
+    def get(self, key: str) -> Optional[Tuple[str, Any]]:
+        """
+        (kind, figure) where kind is "plotly" (a go.Figure), "png" (a matplotlib
+        figure as PNG bytes) or "image" (a PIL image as PNG bytes).
+        """
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        kind, data = item
+        if kind == "plotly":
+            import plotly.io as pio
+            return kind, pio.from_json(data.decode("utf-8"))
+        return kind, data
+
+    # ---------- groups (all figures of one question view) ----------
+    def put_group(self, group: str, figs: List) -> List[str]:
+        keys = [self.put(f"{group}#{i}", fig) for i, fig in enumerate(figs)]
+        with self._lock:
+            self._groups[group] = keys
+        return keys
+
+    def get_group(self, group: str) -> Optional[List[Tuple[str, Any]]]:
+        """Every figure of a group, or None if the group is unknown or partly evicted."""
+        with self._lock:
+            keys = self._groups.get(group)
+            if keys is None or any(k not in self._items for k in keys):
+                self._groups.pop(group, None)
+                return None
+        items = [self.get(k) for k in keys]
+        return None if any(it is None for it in items) else items
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            }
+
+
+_STORE: Optional[FigureStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_figure_store() -> FigureStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = FigureStore()
+        return _STORE
@@ -0,0 +1,102 @@
+# filter_helpers.py
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+# column -> sidebar label
+FILTER_COLUMNS = {
+    "organization": "Organization",
+    "severity_norm": "Severity",
+    "incident_type": "Incident type",
+    "client_name": "Client",
+}
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def dataset_version(name: str, etag: Optional[str], df: pd.DataFrame) -> str:
+    """
+    Cache key for a loaded dataset: its ETag, or a hash of the rows when the HEAD
+    request gave none, so a rewritten object never reuses an older index.
+    """
+    if etag:
+        return f"{name}:{etag}:{len(df)}"
+    digest = int(pd.util.hash_pandas_object(df, index=False).sum())
+    return f"{name}:rows-{digest:016x}:{len(df)}"
+
+
+class FilterIndex:
+    """
+    Row-id indexes over a prepared DataFrame, built once per dataset version.
+
+    Every filter column maps value -> sorted int32 row ids, and incident dates are
+    kept sorted next to their row ids, so a date range is two binary searches.
+    A selection turns each filter into a row bitmap and ANDs them together.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        self.values: Dict[str, Dict[str, np.ndarray]] = {}
+        for col in FILTER_COLUMNS:
+            if col in df.columns:
+                self.values[col] = self._value_index(df[col])
+
+        self.dt_sorted = np.empty(0, dtype="datetime64[ns]")
+        self.dt_rows = _EMPTY
+        if "incident_dt" in df.columns:
+            dts = pd.to_datetime(df["incident_dt"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+            rows = np.flatnonzero(~np.isnat(dts)).astype(np.int32)
+            order = np.argsort(dts[rows], kind="stable")
+            self.dt_rows = rows[order]
+            self.dt_sorted = dts[self.dt_rows]
+
+    @staticmethod
+    def _value_index(s: pd.Series) -> Dict[str, np.ndarray]:
+        codes, uniques = pd.factorize(s.astype(str).where(s.notna(), "(missing)"))
+        order = np.argsort(codes, kind="stable").astype(np.int32)
+        bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))
+        return {str(v): ids for v, ids in zip(uniques, np.split(order, bounds[:-1]))}
+
+    # ---------- introspection ----------
+    def options(self, col: str) -> List[str]:
+        """Values of a filter column, most frequent first."""
+        idx = self.values.get(col, {})
+        return sorted(idx, key=lambda v: -len(idx[v]))
+
+    def date_bounds(self):
+        if not len(self.dt_sorted):
+            return None
+        return pd.Timestamp(self.dt_sorted[0]).date(), pd.Timestamp(self.dt_sorted[-1]).date()
+
+    @property
+    def nbytes(self) -> int:
+        total = self.dt_sorted.nbytes + self.dt_rows.nbytes
+        for idx in self.values.values():
+            total += sum(a.nbytes for a in idx.values())
+        return total
+
+    # ---------- selection ----------
+    def select(self, filters: Dict[str, List[str]], start=None, end=None) -> Optional[np.ndarray]:
+        """
+        Row ids matching every non-empty filter (values within a column are OR-ed)
+        and the optional inclusive date range. Returns None when nothing is filtered.
+        """
+        mask = None
+        for col, chosen in filters.items():
+            if not chosen or col not in self.values:
+                continue
+            bits = np.zeros(self.n_rows, dtype=bool)
+            for v in chosen:
+                bits[self.values[col].get(v, _EMPTY)] = True
+            mask = bits if mask is None else mask & bits
+
+        if start is not None or end is not None:
+            lo = 0 if start is None else np.searchsorted(self.dt_sorted, np.datetime64(pd.Timestamp(start)), "left")
+            hi = len(self.dt_sorted) if end is None else np.searchsorted(
+                self.dt_sorted, np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1)), "left"
+            )
+            bits = np.zeros(self.n_rows, dtype=bool)
+            bits[self.dt_rows[lo:hi]] = True
+            mask = bits if mask is None else mask & bits
+
+        return None if mask is None else np.flatnonzero(mask)
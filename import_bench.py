@@ -0,0 +1,101 @@
+# import_bench.py
+"""
+Import-time harness for the Streamlit app.
+
+For app.py and every page it extracts the top-level import statements and runs
+them in a fresh interpreter, so we measure what a cold container pays before the
+first render (without executing the page itself or touching the cloud).
+Each run is appended to a JSONL history file so regressions show up over time.
+
+    python import_bench.py                 # measure + append to import_times.jsonl
+    python import_bench.py --repeat 5      # best-of-5 per script
+    python import_bench.py --top 10        # also show the 10 slowest modules
+"""
+import argparse
+import ast
+import datetime as dt
+import glob
+import json
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+HISTORY = os.path.join(ROOT, "import_times.jsonl")
+
+
+def _targets() -> List[str]:
+    return ["app.py"] + sorted(os.path.relpath(p, ROOT) for p in glob.glob(os.path.join(ROOT, "pages", "*.py")))
+
+
+def _import_source(script: str) -> str:
+    """Top-level import statements of a script, in order."""
+    with open(os.path.join(ROOT, script), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=script)
+    nodes = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+
+def _measure(script: str) -> Tuple[float, List[Tuple[str, int]]]:
+    """Wall time (s) of the script's imports plus per-module cumulative times (us)."""
+    code = (
+        "import time\n"
+        "_t0 = time.perf_counter()\n"
+        f"{_import_source(script)}\n"
+        "print('__WALL__', time.perf_counter() - _t0)\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+
+    wall = float(next(l for l in proc.stdout.splitlines() if l.startswith("__WALL__")).split()[1])
+    modules = []
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) == 3:
+            # nested imports are indented; keep the raw name so callers can tell
+            modules.append((parts[2].rstrip()[1:], int(parts[1].strip())))
+    return wall, modules
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Measure cold import cost of app.py and each page.")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per script, best one is kept")
+    ap.add_argument("--top", type=int, default=0, help="show the N slowest top-level modules")
+    ap.add_argument("--history", default=HISTORY, help="JSONL file results are appended to")
+    ap.add_argument("--no-save", action="store_true", help="do not append to the history file")
+    args = ap.parse_args()
+
+    results = {}
+    failed = False
+    for script in _targets():
+        try:
+            runs = [_measure(script) for _ in range(max(1, args.repeat))]
+        except Exception as e:
+            print(f"{script:<32} FAILED: {e}")
+            failed = True
+            continue
+        wall, modules = min(runs, key=lambda r: r[0])
+        results[script] = round(wall, 4)
+        print(f"{script:<32} {wall * 1000:8.1f} ms")
+        if args.top:
+            top = sorted((m for m in modules if not m[0].startswith(" ")), key=lambda m: -m[1])
+            for name, us in top[: args.top]:
+                print(f"    {name.strip():<40} {us / 1000:8.1f} ms")
+
+    if results and not args.no_save:
+        rec = {"ts": dt.datetime.utcnow().isoformat(timespec="seconds"), "python": sys.version.split()[0], "seconds": results}
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# lease_helpers.py
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from oci_helpers import put_cloud_object_if, read_cloud_object, delete_cloud_object
+
+LEASE_PREFIX = "locks/"
+LEASE_TTL = int(os.getenv("LEASE_TTL_SECONDS", "300"))       # a lease expires unless renewed
+LEASE_WAIT = int(os.getenv("LEASE_WAIT_SECONDS", "3600"))     # how long a follower waits at most
+LEASE_POLL = float(os.getenv("LEASE_POLL_SECONDS", "2"))
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseLostError(RuntimeError):
+    """The lease expired or was taken over while its holder was still writing."""
+
+
+# ---------- in-process ----------
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(key: str, fn: Callable[[], Any]) -> Any:
+    """Run fn once per key within this process; concurrent callers wait and share its result."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = fn()
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+# ---------- across processes (object storage lease) ----------
+class CloudLease:
+    """
+    Exclusive lease stored as locks/<name>.lease. Acquired with a create-only put
+    (If-None-Match: *), taken over only once expired with a put conditional on the
+    holder's ETag (If-Match), renewed in the background while held and released
+    with a delete conditional on our own ETag.
+    """
+
+    def __init__(self, name: str, ttl: int = LEASE_TTL):
+        self.object_name = f"{LEASE_PREFIX}{name}.lease"
+        self.ttl = ttl
+        self.etag: Optional[str] = None
+        self.expires = 0.0
+        self._lost = threading.Event()
+        self._stop = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+
+    def _body(self) -> bytes:
+        self._next_expiry = time.time() + self.ttl
+        return json.dumps({"owner": OWNER, "expires": self._next_expiry}).encode("utf-8")
+
+    @property
+    def held(self) -> bool:
+        """False once a renewal failed or the last renewal is older than the TTL."""
+        return self.etag is not None and not self._lost.is_set() and time.time() < self.expires
+
+    def check(self):
+        """Raise LeaseLostError unless the lease is still held; call before every write."""
+        if not self.held:
+            raise LeaseLostError(f"lost {self.object_name}; refusing to write")
+
+    def try_acquire(self) -> bool:
+        etag = put_cloud_object_if(self.object_name, self._body(), if_none_match="*")
+        if etag is None:
+            cur = read_cloud_object(self.object_name)
+            if cur is None:
+                return False  # released meanwhile; retry on the next poll
+            content, cur_etag = cur
+            try:
+                expires = float(json.loads(content).get("expires", 0))
+            except Exception:
+                expires = 0.0
+            if expires > time.time():
+                return False
+            etag = put_cloud_object_if(self.object_name, self._body(), if_match=cur_etag)
+            if etag is None:
+                return False
+            print(f"[lease] took over expired {self.object_name}")
+        self.etag = etag
+        self.expires = self._next_expiry
+        self._lost.clear()
+        self._stop.clear()
+        self._renewer = threading.Thread(target=self._renew, daemon=True)
+        self._renewer.start()
+        return True
+
+    def _renew(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                etag = put_cloud_object_if(self.object_name, self._body(), if_match=self.etag)
+            except Exception as e:
+                print(f"[lease] renewing {self.object_name} failed: {e}")
+                continue  # retried next round; `held` turns False once the TTL passes
+            if etag is None:
+                print(f"[lease] lost {self.object_name}")
+                self._lost.set()
+                return
+            self.etag = etag
+            self.expires = self._next_expiry
+
+    def release(self):
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join()
+        if self.etag and not self._lost.is_set():
+            delete_cloud_object(self.object_name, if_match=self.etag)
+        self.etag = None
+
+
+_current: ContextVar[Optional[CloudLease]] = ContextVar("current_lease", default=None)
+
+
+def lease_guard() -> Callable[[], None]:
+    """
+    A check for the lease held by the running `compute()`, to call before each
+    write. Capture it in the calling thread and hand it to worker threads.
+    Outside run_once it does nothing.
+    """
+    lease = _current.get()
+    return lease.check if lease is not None else (lambda: None)
+
+
+def run_once(name: str, fingerprint: str, load_existing: Callable[[], Any], compute: Callable[[], Any]) -> Any:
+    """
+    Produce the result for (name, fingerprint) at most once across sessions and
+    processes. `load_existing()` returns the stored result if some run already
+    produced it for this fingerprint (else None) and must not write anything, as
+    it also runs without the lease; `compute()` produces and stores it.
+    Only the lease holder computes; everyone else waits and then reuses the result.
+    Writers inside `compute()` call `lease_guard()()` before each write.
+    """
+    def _run():
+        deadline = time.time() + LEASE_WAIT
+        while True:
+            res = load_existing()
+            if res is not None:
+                return res
+            lease = CloudLease(name)
+            if lease.try_acquire():
+                token = _current.set(lease)
+                try:
+                    res = load_existing()  # it may have finished just before we got the lease
+                    return res if res is not None else compute()
+                finally:
+                    _current.reset(token)
+                    lease.release()
+            if time.time() > deadline:
+                raise TimeoutError(f"Timed out waiting for '{name}' lease")
+            time.sleep(LEASE_POLL)
+
+    return single_flight(f"{name}:{fingerprint}", _run)
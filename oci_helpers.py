@@ -1,19 +1,38 @@
 # oci_helpers.py
 import os
 import io
+import csv
+import gzip
 import time
 import pandas as pd
 import datetime as dt
-from typing import Optional, Tuple, List
-import streamlit as st
-import oci
-from oci.object_storage.models import CreatePreauthenticatedRequestDetails
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# NOTE: the `oci` SDK is imported lazily inside the functions below. It is by far
+# the heaviest import of the app and is only needed once we actually talk to
+# Object Storage, so pages that never hit the cloud pay nothing for it.
+# Streamlit is optional here too, so the pipeline CLI can run without it.
+
+
+def _secret(key: str, default: Optional[str] = None) -> Optional[str]:
+    """Environment variable first, then Streamlit secrets when running inside the app."""
+    if key in os.environ:
+        return os.environ[key]
+    try:
+        import streamlit as st
+        return st.secrets.get(key, default)
+    except Exception:  # streamlit missing or no secrets.toml
+        return default
+
 
 # -----------------------
 # Build OCI config
 # -----------------------
-@st.cache_resource(show_spinner=False)
-def get_oci_client() -> Tuple[oci.object_storage.ObjectStorageClient, dict]:
+@lru_cache(maxsize=1)
+def get_oci_client() -> Tuple[Any, dict]:
+    import oci
+
     config = _build_oci_config()
     client = oci.object_storage.ObjectStorageClient(config)
     return client, config
@@ -21,15 +40,17 @@ def get_oci_client() -> Tuple[oci.object_storage.ObjectStorageClient, dict]:
 
 def _build_oci_config() -> dict:
     """
-    Build OCI config from Streamlit secrets (flat keys) or local ~/.oci/config.
+    Build OCI config from flat keys (environment or Streamlit secrets) or local ~/.oci/config.
     """
-    if "OCI_USER_OCID" in st.secrets:
+    import oci
+
+    if _secret("OCI_USER_OCID"):
         return {
-            "user": st.secrets["OCI_USER_OCID"],
-            "tenancy": st.secrets["OCI_TENANCY_OCID"],
-            "region": st.secrets["OCI_REGION"],
-            "fingerprint": st.secrets["OCI_FINGERPRINT"],
-            "key_content": st.secrets["OCI_KEY_CONTENT"],
+            "user": _secret("OCI_USER_OCID"),
+            "tenancy": _secret("OCI_TENANCY_OCID"),
+            "region": _secret("OCI_REGION"),
+            "fingerprint": _secret("OCI_FINGERPRINT"),
+            "key_content": _secret("OCI_KEY_CONTENT"),
         }
 
     # fallback to ~/.oci/config
@@ -41,18 +62,229 @@ def _build_oci_config() -> dict:
 # -----------------------
 # Namespace + Bucket
 # -----------------------
-NAMESPACE = os.getenv("OCI_NAMESPACE", st.secrets.get("OCI_NAMESPACE", "sdzbwxl65lpx"))
-BUCKET = os.getenv("OCI_BUCKET", st.secrets.get("OCI_BUCKET", "incident-data-bucket"))
+_DEFAULT_NAMESPACE = "sdzbwxl65lpx"
+_DEFAULT_BUCKET = "incident-data-bucket"
+_LOCATION: Optional[Tuple[str, str]] = None
+
+
+def get_location() -> Tuple[str, str]:
+    """
+    Resolve (namespace, bucket) on first use instead of at import time, so that
+    importing this module never touches `st.secrets`.
+    """
+    global _LOCATION
+    if _LOCATION is None:
+        _LOCATION = (
+            _secret("OCI_NAMESPACE", _DEFAULT_NAMESPACE),
+            _secret("OCI_BUCKET", _DEFAULT_BUCKET),
+        )
+    return _LOCATION
+
+
+def __getattr__(name: str):
+    # keep `from oci_helpers import NAMESPACE, BUCKET` working
+    if name == "NAMESPACE":
+        return get_location()[0]
+    if name == "BUCKET":
+        return get_location()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # -----------------------
-# Object Storage Helpers
+# Declared CSV schemas
+# -----------------------
+# object name (or prefix ending in "/") -> {column: dtype}. Filled in by the module
+# that owns the objects (see prep_helpers). Columns not listed keep inferred types.
+CSV_SCHEMAS: Dict[str, Dict[str, str]] = {}
+STRING_DTYPE = "string[pyarrow]"
+DATETIME_DTYPE = "datetime64[ns]"
+
+
+def _schema_for(object_name: str) -> Dict[str, str]:
+    if object_name in CSV_SCHEMAS:
+        return CSV_SCHEMAS[object_name]
+    prefixes = [k for k in CSV_SCHEMAS if k.endswith("/") and object_name.startswith(k)]
+    return CSV_SCHEMAS[max(prefixes, key=len)] if prefixes else {}
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Cast declared columns to their compact dtypes in place; unparseable values become NA."""
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        s = df[col]
+        try:
+            if dtype == DATETIME_DTYPE:
+                df[col] = pd.to_datetime(s, errors="coerce")
+            elif dtype.startswith("Int"):
+                df[col] = pd.to_numeric(s, errors="coerce").round().astype(dtype)
+            elif dtype.startswith("float"):
+                df[col] = pd.to_numeric(s, errors="coerce").astype(dtype)
+            else:
+                df[col] = s.astype(dtype)
+        except Exception as e:
+            print(f"[schema] kept inferred dtype for '{col}' ({dtype}): {e}")
+    return df
+
+
+def _read_csv(open_stream: Callable[[], Any], schema: Dict[str, str]) -> pd.DataFrame:
+    """
+    Parse a CSV straight from a (possibly decompressing) stream. `open_stream`
+    returns a fresh stream, so the C-engine fallback can start over.
+    """
+    # text-like columns are parsed as text so IDs such as "0042" survive and
+    # empty cells stay missing (pandas' pyarrow engine turns them into "None")
+    text_cols = [c for c, t in schema.items() if t in (STRING_DTYPE, "category")]
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        opts = pacsv.ConvertOptions(column_types={c: pa.string() for c in text_cols}, strings_can_be_null=True)
+        with open_stream() as f:
+            return pacsv.read_csv(f, convert_options=opts).to_pandas()
+    except Exception:
+        with open_stream() as f:
+            return pd.read_csv(f, dtype={c: str for c in text_cols} or None)
+
+
+def _mem(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+# -----------------------
+# Compression
 # -----------------------
-def load_cloud_csv(object_name: str, columns: Optional[list] = None) -> pd.DataFrame:
+# CSVs are stored compressed with Content-Encoding set; reads decompress while
+# parsing. zstd needs the optional `zstandard` package, otherwise gzip is used.
+CSV_COMPRESSION = os.getenv("CSV_COMPRESSION", "gzip").lower()   # gzip | zstd | none
+CSV_COMPRESS_LEVEL = int(os.getenv("CSV_COMPRESS_LEVEL", "6"))
+RAW_SIZE_META = "raw-bytes"
+_READ_BLOCK = 1024 * 1024
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def _compress(raw: bytes, method: str = CSV_COMPRESSION) -> Tuple[bytes, Optional[str]]:
+    """(payload, content-encoding or None)."""
+    if method == "zstd":
+        zstd = _zstd()
+        if zstd is not None:
+            return zstd.ZstdCompressor(level=CSV_COMPRESS_LEVEL).compress(raw), "zstd"
+        print("[compress] zstandard not installed, using gzip")
+        method = "gzip"
+    if method == "gzip":
+        return gzip.compress(raw, compresslevel=CSV_COMPRESS_LEVEL, mtime=0), "gzip"
+    return raw, None
+
+
+def _decoding_reader(stream, encoding: Optional[str]):
+    """Wrap a raw byte stream so that reading it yields decompressed bytes."""
+    encoding = (encoding or "").lower()
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if encoding == "zstd":
+        zstd = _zstd()
+        if zstd is None:
+            raise RuntimeError("object is zstd-compressed but zstandard is not installed")
+        return zstd.ZstdDecompressor().stream_reader(stream, closefd=False)
+    if encoding in ("", "identity"):
+        return stream
+    raise ValueError(f"unsupported Content-Encoding {encoding!r}")
+
+
+class _TimedStream(io.RawIOBase):
+    """Byte stream that adds up the time spent reading from the network, not in the consumer."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.seconds = 0.0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        t0 = time.perf_counter()
+        data = self.raw.read(len(b))
+        self.seconds += time.perf_counter() - t0
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def _open_object(object_name: str, timed: Optional[List[_TimedStream]] = None, **kwargs) -> Tuple[Any, Any]:
+    """
+    GET an object as an undecoded stream. Returns (response, stream of decompressed bytes).
+    With `timed`, the network stream is wrapped in a _TimedStream appended to it.
+    """
     client, _ = get_oci_client()
+    namespace, bucket = get_location()
+    resp = client.get_object(namespace, bucket, object_name, **kwargs)
+    raw = resp.data.raw
+    raw.decode_content = False  # we decompress ourselves, also for encodings urllib3 doesn't know
+    if timed is not None:
+        raw = _TimedStream(raw)
+        timed.append(raw)
+    return resp, _decoding_reader(raw, resp.headers.get("content-encoding"))
+
+
+def _transfer_stats(direction: str, object_name: str, raw: int, wire: int, seconds: float) -> dict:
+    """
+    Compression ratio and an estimate of the transfer time saved: the measured
+    rate applied to the bytes that did not have to travel.
+    """
+    ratio = raw / wire if wire else 1.0
+    saved = seconds * (ratio - 1) if raw > wire else 0.0
+    stats = {"raw_bytes": raw, "wire_bytes": wire, "ratio": round(ratio, 2),
+             "seconds": round(seconds, 2), "seconds_saved": round(saved, 2)}
+    if raw > wire:
+        print(f"[{direction}] {object_name}: {wire / 1e6:.1f} MB on the wire for {raw / 1e6:.1f} MB "
+              f"(x{ratio:.1f}), ~{saved:.1f} s saved")
+    return stats
+
+
+# -----------------------
+# Object Storage Helpers
+# -----------------------
+def load_cloud_csv(object_name: str, columns: Optional[list] = None,
+                   schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Download a CSV and parse it with the pyarrow engine, casting the columns
+    declared in CSV_SCHEMAS (or `schema`) to compact dtypes. Compressed objects
+    are decompressed as they stream into the parser.
+    Memory before/after the cast is kept in df.attrs["memory"], compression
+    ratio and transfer time (network reads only, without decompression and
+    parsing) in df.attrs["transfer"].
+    """
+    schema = _schema_for(object_name) if schema is None else schema
     try:
-        resp = client.get_object(NAMESPACE, BUCKET, object_name)
-        df = pd.read_csv(io.BytesIO(resp.data.content))
+        responses, timed = [], []
+
+        def _stream():
+            resp, reader = _open_object(object_name, timed=timed)
+            responses.append(resp)
+            return reader
+
+        df = _read_csv(_stream, schema)
+        h = responses[-1].headers
+        if h.get("content-encoding"):
+            wire = int(h.get("content-length", 0) or 0)
+            raw = int(h.get(f"opc-meta-{RAW_SIZE_META}", 0) or 0)
+            df.attrs["transfer"] = _transfer_stats("load", object_name, raw, wire, timed[-1].seconds)
+        if schema:
+            before = _mem(df)
+            apply_schema(df, schema)
+            after = _mem(df)
+            df.attrs["memory"] = {"inferred": before, "typed": after}
+            print(f"[load] {object_name}: {len(df)} rows, {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB with schema")
         if columns:
             for c in columns:
                 if c not in df.columns:
@@ -62,20 +294,94 @@ def load_cloud_csv(object_name: str, columns: Optional[list] = None) -> pd.DataF
         return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
 
 
-def upload_cloud_csv(object_name: str, df: pd.DataFrame):
+def upload_cloud_csv(object_name: str, df: pd.DataFrame, metadata: Optional[Dict[str, str]] = None,
+                     compression: str = CSV_COMPRESSION) -> dict:
+    """
+    Upload df as CSV, compressed per CSV_COMPRESSION with Content-Encoding set;
+    `metadata` is stored as opc-meta-* user metadata on the object.
+    Returns the transfer stats (sizes, ratio, seconds).
+    """
     client, _ = get_oci_client()
-    bio = io.BytesIO()
-    df.to_csv(bio, index=False)
-    bio.seek(0)
-    client.put_object(NAMESPACE, BUCKET, object_name, bio)
+    namespace, bucket = get_location()
+    raw = df.to_csv(index=False).encode("utf-8")
+    payload, encoding = _compress(raw, compression)
+    meta = dict(metadata or {})
+    if encoding:
+        meta[RAW_SIZE_META] = str(len(raw))
+    t0 = time.perf_counter()
+    client.put_object(namespace, bucket, object_name, io.BytesIO(payload), opc_meta=meta or None,
+                      content_type="text/csv", content_encoding=encoding)
+    return _transfer_stats("upload", object_name, len(raw), len(payload), time.perf_counter() - t0)
+
+
+def head_cloud_object(object_name: str) -> Optional[dict]:
+    """ETag, stored size, content encoding and user metadata of an object, or None if it does not exist."""
+    client, _ = get_oci_client()
+    namespace, bucket = get_location()
+    try:
+        resp = client.head_object(namespace, bucket, object_name)
+    except Exception:
+        return None
+    h = resp.headers
+    meta = {k[len("opc-meta-"):]: v for k, v in h.items() if k.lower().startswith("opc-meta-")}
+    return {"etag": h.get("etag"), "size": int(h.get("content-length", 0) or 0), "meta": meta,
+            "encoding": h.get("content-encoding")}
+
+
+def delete_cloud_object(object_name: str, if_match: Optional[str] = None) -> bool:
+    client, _ = get_oci_client()
+    namespace, bucket = get_location()
+    try:
+        client.delete_object(namespace, bucket, object_name, if_match=if_match)
+        return True
+    except Exception:
+        return False
+
+
+def read_cloud_object(object_name: str) -> Optional[Tuple[bytes, str]]:
+    """(content, ETag) of an object, or None if it does not exist."""
+    client, _ = get_oci_client()
+    namespace, bucket = get_location()
+    try:
+        resp = client.get_object(namespace, bucket, object_name)
+    except Exception:
+        return None
+    return resp.data.content, resp.headers.get("etag")
+
+
+def put_cloud_object_if(object_name: str, data: bytes, if_match: Optional[str] = None,
+                        if_none_match: Optional[str] = None) -> Optional[str]:
+    """
+    Conditional put. Returns the new ETag, or None if the precondition failed
+    (if_none_match="*": the object already exists; if_match: it changed meanwhile).
+    """
+    from oci.exceptions import ServiceError
+
+    client, _ = get_oci_client()
+    namespace, bucket = get_location()
+    try:
+        resp = client.put_object(namespace, bucket, object_name, io.BytesIO(data),
+                                 if_match=if_match, if_none_match=if_none_match)
+    except ServiceError as e:
+        if e.status in (409, 412):
+            return None
+        raise
+    return resp.headers.get("etag")
+
+
+def upload_cloud_bytes(object_name: str, data: bytes, content_type: str = "application/octet-stream"):
+    client, _ = get_oci_client()
+    namespace, bucket = get_location()
+    client.put_object(namespace, bucket, object_name, io.BytesIO(data), content_type=content_type)
 
 
 def list_objects(prefix: str = "") -> List[str]:
     client, _ = get_oci_client()
+    namespace, bucket = get_location()
     names = []
     start = None
     while True:
-        resp = client.list_objects(NAMESPACE, BUCKET, prefix=prefix, start=start, fields="name")
+        resp = client.list_objects(namespace, bucket, prefix=prefix, start=start, fields="name")
         for obj in resp.data.objects:
             names.append(obj.name)
         if not resp.data.next_start_with:
@@ -84,16 +390,171 @@ def list_objects(prefix: str = "") -> List[str]:
     return sorted(names)
 
 
+# -----------------------
+# Range-read previews
+# -----------------------
+PREVIEW_CHUNK_BYTES = int(os.getenv("PREVIEW_CHUNK_BYTES", str(64 * 1024)))
+PREVIEW_MAX_BYTES = int(os.getenv("PREVIEW_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+def _get_range(object_name: str, start: int, end: int) -> Tuple[bytes, Optional[int]]:
+    """Fetch bytes [start, end] (inclusive) of an object. Returns (data, total object size or None)."""
+    client, _ = get_oci_client()
+    namespace, bucket = get_location()
+    resp = client.get_object(namespace, bucket, object_name, range=f"bytes={start}-{end}")
+    data = resp.data.content
+    if resp.status != 206:
+        # server ignored the range and sent the whole object
+        return data[start:end + 1], len(data)
+    total = None
+    cr = resp.headers.get("content-range", "")  # e.g. "bytes 0-65535/1234567"
+    if "/" in cr and not cr.endswith("*"):
+        total = int(cr.rsplit("/", 1)[1])
+    return data, total
+
+
+def _record_ends(buf: bytes) -> List[int]:
+    """Byte offsets just past each complete CSV record (a newline outside quotes)."""
+    ends, quoted, pos = [], False, 0
+    while True:
+        nl = buf.find(b"\n", pos)
+        if nl < 0:
+            return ends
+        if buf.count(b'"', pos, nl) % 2:
+            quoted = not quoted
+        if not quoted:
+            ends.append(nl + 1)
+        pos = nl + 1
+
+
+def _collect_records(next_chunk: Callable[[int], Tuple[bytes, bool]], n_records: int) -> Tuple[bytes, List[int], bool]:
+    """
+    Pull chunks until at least n_records complete records arrived, doubling the
+    chunk size each round. Returns (bytes, record end offsets, eof).
+    """
+    buf, want = b"", PREVIEW_CHUNK_BYTES
+    while True:
+        chunk, eof = next_chunk(want)
+        buf += chunk
+        ends = _record_ends(buf)
+        if len(ends) >= n_records or eof or len(buf) >= PREVIEW_MAX_BYTES:
+            break
+        want *= 2
+    if eof and buf and buf[-1:] != b"\n":
+        ends.append(len(buf))  # last record without a trailing newline
+    return buf, ends, eof
+
+
+def _read_records(object_name: str, start: int, n_records: int,
+                  encoding: Optional[str] = None) -> Tuple[bytes, List[int], bool]:
+    """Read n_records complete records starting at byte `start` of the (decompressed) CSV."""
+    if encoding:
+        return _read_records_decoded(object_name, start, n_records)
+    pos = start
+
+    def _next(want: int) -> Tuple[bytes, bool]:
+        nonlocal pos
+        chunk, total = _get_range(object_name, pos, pos + want - 1)
+        pos += len(chunk)
+        return chunk, len(chunk) < want or (total is not None and pos >= total)
+
+    return _collect_records(_next, n_records)
+
+
+def _read_exact(reader, n: int) -> bytes:
+    parts, got = [], 0
+    while got < n:
+        part = reader.read(n - got)
+        if not part:
+            break
+        parts.append(part)
+        got += len(part)
+    return b"".join(parts)
+
+
+def _read_records_decoded(object_name: str, start: int, n_records: int) -> Tuple[bytes, List[int], bool]:
+    """
+    Compressed objects cannot be range-read by row, so the object is streamed
+    from its beginning and decompressed incrementally; `start` is an offset into
+    the decompressed CSV. Only the compressed bytes up to the page are fetched.
+    """
+    resp, reader = _open_object(object_name)
+    try:
+        skip = start
+        while skip > 0:
+            chunk = _read_exact(reader, min(skip, _READ_BLOCK))
+            if not chunk:
+                return b"", [], True
+            skip -= len(chunk)
+
+        def _next(want: int) -> Tuple[bytes, bool]:
+            chunk = _read_exact(reader, want)
+            return chunk, len(chunk) < want
+
+        return _collect_records(_next, n_records)
+    finally:
+        resp.data.close()
+
+
+def _parse_header(raw: bytes) -> List[str]:
+    return next(csv.reader([raw.decode("utf-8-sig").rstrip("\r\n")]))
+
+
+def preview_cloud_csv(object_name: str, n_rows: int = 500, offset: int = 0,
+                      schema: Optional[Dict[str, str]] = None) -> Tuple[pd.DataFrame, Optional[int]]:
+    """
+    Read only n_rows data rows of a cloud CSV using HTTP Range requests. Columns
+    are typed per CSV_SCHEMAS (or `schema`) like load_cloud_csv does.
+
+    `offset` is the byte offset of the first row to return (0 = start of the
+    object); the second value returned is the offset of the next page, or None at
+    the end of the object. Previewing a multi-GB object therefore costs kilobytes.
+    For compressed objects offsets count decompressed bytes and a page costs the
+    compressed bytes up to it.
+    """
+    schema = _schema_for(object_name) if schema is None else schema
+    try:
+        encoding = (head_cloud_object(object_name) or {}).get("encoding")
+        if offset <= 0:
+            buf, ends, eof = _read_records(object_name, 0, n_rows + 1, encoding)
+            if not ends:
+                return pd.DataFrame(), None
+            header = _parse_header(buf[:ends[0]])
+            base, ends = ends[0], ends[1:]
+            pos = 0
+        else:
+            hbuf, hends, _ = _read_records(object_name, 0, 1, encoding)
+            header = _parse_header(hbuf[:hends[0]])
+            buf, ends, eof = _read_records(object_name, offset, n_rows, encoding)
+            base, pos = 0, offset
+
+        ends = ends[:n_rows]
+        cut = ends[-1] if ends else base
+        if cut > base:
+            text_cols = {c: str for c, t in schema.items() if t in (STRING_DTYPE, "category") and c in header}
+            df = pd.read_csv(io.BytesIO(buf[base:cut]), header=None, names=header, dtype=text_cols or None)
+            apply_schema(df, schema)
+        else:
+            df = pd.DataFrame(columns=header)
+        done = eof and cut >= len(buf)
+        return df, (None if done else pos + cut)
+    except Exception:
+        return pd.DataFrame(), None
+
+
 def create_share_link(object_name: str, days: int = 7) -> Optional[str]:
     try:
+        from oci.object_storage.models import CreatePreauthenticatedRequestDetails
+
         client, cfg = get_oci_client()
+        namespace, bucket = get_location()
         details = CreatePreauthenticatedRequestDetails(
             name=f"par-{object_name}-{int(time.time())}",
             access_type="ObjectRead",
             time_expires=(dt.datetime.utcnow() + dt.timedelta(days=days)),
             object_name=object_name,
         )
-        par = client.create_preauthenticated_request(NAMESPACE, BUCKET, details).data
+        par = client.create_preauthenticated_request(namespace, bucket, details).data
         return f"https://objectstorage.{cfg['region']}.oraclecloud.com{par.access_uri}"
     except Exception:
         return None
@@ -1,6 +1,11 @@
 import os
 import json
 import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import numpy as np
 import requests
 
 # --- Ollama API setup (using bakllava:7b everywhere) ---
@@ -8,10 +13,153 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "bakllava:7b")
 GEN_URL = os.getenv("OLLAMA_URL_GENERATE", "http://127.0.0.1:11434/api/generate")
 CHAT_URL = os.getenv("OLLAMA_URL_CHAT", "http://127.0.0.1:11434/v1/chat/completions")
 
+# Embeddings (category normalization)
+EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+EMBED_PATH = "/api/embed"
+EMBED_BATCH = int(os.getenv("OLLAMA_EMBED_BATCH", "64"))
+EMBED_THRESHOLD = float(os.getenv("OLLAMA_EMBED_THRESHOLD", "0.80"))  # min cosine similarity to accept
+EMBED_RETRY_AFTER = float(os.getenv("OLLAMA_EMBED_RETRY_AFTER", "600"))  # pause after retries ran out
+
 # Retry settings
 MAX_RETRIES = 5       # how many times to retry
 RETRY_DELAY = 15      # seconds between retries
 
+# --- Endpoints ---
+# Comma-separated Ollama base URLs, e.g. "http://10.0.0.5:11434,http://10.0.0.6:11434".
+# Defaults to the host of GEN_URL, so a single-box setup needs no change.
+def _base_url(url: str) -> str:
+    p = urlsplit(url)
+    return f"{p.scheme}://{p.netloc}"
+
+
+OLLAMA_ENDPOINTS = [
+    u.strip().rstrip("/") for u in os.getenv("OLLAMA_ENDPOINTS", _base_url(GEN_URL)).split(",") if u.strip()
+]
+GEN_PATH = urlsplit(GEN_URL).path or "/api/generate"
+CHAT_PATH = urlsplit(CHAT_URL).path or "/v1/chat/completions"
+MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))      # in-flight requests per endpoint
+HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))   # seconds between health checks
+QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "600"))      # max wait for a free endpoint
+
+
+# --- Router ---
+def _endpoint_failed(e: BaseException) -> bool:
+    """True for errors that say the box itself is in trouble, not the request."""
+    if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(e, requests.HTTPError):
+        return e.response is None or e.response.status_code >= 500
+    return False
+
+
+class _Endpoint:
+    def __init__(self, base: str):
+        self.base = base
+        self.outstanding = 0
+        self.healthy = True
+        self.served = 0
+        self.failures = 0
+
+
+class OllamaRouter:
+    """
+    Least-outstanding-requests routing over several Ollama boxes.
+    Each endpoint takes at most `max_concurrency` requests at a time; callers
+    queue when every healthy endpoint is busy. A background thread polls
+    /api/tags to take endpoints out of (and back into) rotation, and a request
+    that fails on the endpoint itself (connection error, timeout, 5xx) marks it
+    unhealthy until the next successful check. Client errors (4xx) do not.
+    """
+
+    def __init__(self, endpoints: List[str], max_concurrency: int = MAX_CONCURRENCY,
+                 health_interval: float = HEALTH_INTERVAL):
+        self.endpoints = [_Endpoint(u) for u in endpoints]
+        self.max_concurrency = max(1, max_concurrency)
+        self.health_interval = health_interval
+        self._cond = threading.Condition()
+        self._health_thread: Optional[threading.Thread] = None
+
+    # ---------- health ----------
+    @staticmethod
+    def _is_up(ep: _Endpoint) -> bool:
+        try:
+            return requests.get(ep.base + "/api/tags", timeout=5).status_code == 200
+        except Exception:
+            return False
+
+    def _health_loop(self):
+        while True:
+            for ep in self.endpoints:
+                up = self._is_up(ep)
+                with self._cond:
+                    if up != ep.healthy:
+                        print(f"[Ollama router] {ep.base} is {'up' if up else 'down'}")
+                    ep.healthy = up
+                    self._cond.notify_all()
+            time.sleep(self.health_interval)
+
+    def _ensure_health_thread(self):
+        if self._health_thread is None and len(self.endpoints) > 1:
+            self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+            self._health_thread.start()
+
+    # ---------- dispatch ----------
+    def _pick(self) -> Optional[_Endpoint]:
+        candidates = [e for e in self.endpoints if e.healthy] or self.endpoints  # all down: keep trying
+        free = [e for e in candidates if e.outstanding < self.max_concurrency]
+        return min(free, key=lambda e: e.outstanding) if free else None
+
+    @contextmanager
+    def lease(self, timeout: float = QUEUE_TIMEOUT):
+        """Reserve a slot on the least-loaded healthy endpoint; yields its base URL."""
+        self._ensure_health_thread()
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                ep = self._pick()
+                if ep is not None:
+                    ep.outstanding += 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError("No Ollama endpoint became free in time")
+                self._cond.wait(remaining)
+        down = False
+        try:
+            yield ep.base
+        except BaseException as e:
+            down = _endpoint_failed(e)
+            raise
+        finally:
+            with self._cond:
+                ep.outstanding -= 1
+                ep.served += 1
+                if down:
+                    ep.failures += 1
+                    if len(self.endpoints) > 1:
+                        ep.healthy = False
+                self._cond.notify_all()
+
+    def stats(self) -> List[dict]:
+        with self._cond:
+            return [
+                {"endpoint": e.base, "healthy": e.healthy, "outstanding": e.outstanding,
+                 "served": e.served, "failures": e.failures}
+                for e in self.endpoints
+            ]
+
+
+_ROUTER: Optional[OllamaRouter] = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router() -> OllamaRouter:
+    global _ROUTER
+    with _ROUTER_LOCK:
+        if _ROUTER is None:
+            _ROUTER = OllamaRouter(OLLAMA_ENDPOINTS)
+        return _ROUTER
+
 
 # --- Helpers ---
 def clean_markdown_json(text: str) -> str:
@@ -33,11 +181,12 @@ def _ollama_generate_json(prompt: str, images=None) -> dict:
             if images:
                 payload["images"] = images
 
-            r = requests.post(GEN_URL, json=payload, timeout=120)
-            if r.status_code == 200:
-                raw = (r.json().get("response") or "").strip()
-                if raw:
-                    return json.loads(clean_markdown_json(raw))
+            with get_router().lease() as base:
+                r = requests.post(base + GEN_PATH, json=payload, timeout=120)
+                r.raise_for_status()  # inside the lease, so a 5xx marks this endpoint
+            raw = (r.json().get("response") or "").strip()
+            if raw:
+                return json.loads(clean_markdown_json(raw))
 
         except Exception as e:
             print(f"[Ollama generate failed] attempt {attempt+1}/{MAX_RETRIES}: {e}")
@@ -52,16 +201,16 @@ def _ollama_generate_json(prompt: str, images=None) -> dict:
             if images:
                 msg[0]["images"] = images
 
-            r = requests.post(
-                CHAT_URL,
-                json={"model": OLLAMA_MODEL, "messages": msg, "stream": False},
-                timeout=120,
-            )
-            if r.status_code == 200:
-                j = r.json()
-                raw = j["choices"][0]["message"]["content"].strip()
-                if raw:
-                    return json.loads(clean_markdown_json(raw))
+            with get_router().lease() as base:
+                r = requests.post(
+                    base + CHAT_PATH,
+                    json={"model": OLLAMA_MODEL, "messages": msg, "stream": False},
+                    timeout=120,
+                )
+                r.raise_for_status()
+            raw = r.json()["choices"][0]["message"]["content"].strip()
+            if raw:
+                return json.loads(clean_markdown_json(raw))
         except Exception as e:
             print(f"[Ollama chat failed] attempt {attempt+1}/{MAX_RETRIES}: {e}")
 
@@ -79,24 +228,25 @@ def ollama_generate(prompt: str, images=None, stream: bool = False, timeout: int
 
     for attempt in range(MAX_RETRIES):
         try:
-            r = requests.post(GEN_URL, json=payload, timeout=timeout, stream=stream)
-            r.raise_for_status()
-
-            if stream:
-                output = []
-                for line in r.iter_lines():
-                    if line:
-                        try:
-                            js = json.loads(line.decode("utf-8"))
-                            chunk = js.get("response", "")
-                            if chunk:
-                                output.append(chunk)
-                        except Exception:
-                            continue
-                return "".join(output).strip()
-            else:
-                js = r.json()
-                return (js.get("response") or "").strip()
+            with get_router().lease() as base:
+                r = requests.post(base + GEN_PATH, json=payload, timeout=timeout, stream=stream)
+                r.raise_for_status()
+
+                if stream:
+                    output = []
+                    for line in r.iter_lines():
+                        if line:
+                            try:
+                                js = json.loads(line.decode("utf-8"))
+                                chunk = js.get("response", "")
+                                if chunk:
+                                    output.append(chunk)
+                            except Exception:
+                                continue
+                    return "".join(output).strip()
+                else:
+                    js = r.json()
+                    return (js.get("response") or "").strip()
 
         except Exception as e:
             print(f"[Ollama error] attempt {attempt+1}/{MAX_RETRIES}: {e}")
@@ -122,3 +272,132 @@ def ask_for_category_mapping(column_name: str, values: list) -> dict:
 
     result = _ollama_generate_json(prompt)
     return result if isinstance(result, dict) else {}
+
+
+# --- Embedding-based normalization ---
+# embeddings are skipped until this time: a 4xx (e.g. model not pulled) disables
+# them for the process, exhausted retries for EMBED_RETRY_AFTER seconds
+_EMBED_DOWN_UNTIL = 0.0
+
+
+def ollama_embed(texts: List[str]) -> np.ndarray:
+    """
+    Embed texts in batches through /api/embed. Rows are L2-normalized so a dot
+    product is the cosine similarity. Returns an empty array if a batch keeps
+    failing; client errors (4xx) are not retried.
+    """
+    global _EMBED_DOWN_UNTIL
+    empty = np.zeros((0, 0), dtype=np.float32)
+    if time.time() < _EMBED_DOWN_UNTIL:
+        return empty
+
+    vecs = []
+    for i in range(0, len(texts), EMBED_BATCH):
+        batch = texts[i:i + EMBED_BATCH]
+        for attempt in range(MAX_RETRIES):
+            try:
+                with get_router().lease() as base:
+                    r = requests.post(base + EMBED_PATH, json={"model": EMBED_MODEL, "input": batch}, timeout=120)
+                    r.raise_for_status()
+                emb = r.json().get("embeddings") or []
+                if len(emb) != len(batch):
+                    raise ValueError(f"got {len(emb)} embeddings for {len(batch)} inputs")
+                vecs.extend(emb)
+                break
+            except requests.HTTPError as e:
+                if e.response is not None and 400 <= e.response.status_code < 500:
+                    print(f"[Ollama embed] {e}; embeddings disabled for this process")
+                    _EMBED_DOWN_UNTIL = float("inf")
+                    return empty
+                print(f"[Ollama embed failed] attempt {attempt+1}/{MAX_RETRIES}: {e}")
+                time.sleep(RETRY_DELAY)
+            except Exception as e:
+                print(f"[Ollama embed failed] attempt {attempt+1}/{MAX_RETRIES}: {e}")
+                time.sleep(RETRY_DELAY)
+        else:
+            _EMBED_DOWN_UNTIL = time.time() + EMBED_RETRY_AFTER
+            return empty
+
+    m = np.asarray(vecs, dtype=np.float32)
+    if m.size == 0:
+        return empty
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+class CanonicalIndex:
+    """Vector index of canonical category labels; nearest neighbour by cosine similarity."""
+
+    def __init__(self, labels: List[str]):
+        self.labels = list(labels)
+        self.vectors = ollama_embed(self.labels)
+
+    @property
+    def ready(self) -> bool:
+        return self.vectors.shape[0] == len(self.labels) and len(self.labels) > 0
+
+    def nearest(self, vectors: np.ndarray) -> Tuple[List[str], np.ndarray]:
+        sims = vectors @ self.vectors.T
+        best = sims.argmax(axis=1)
+        return [self.labels[i] for i in best], sims[np.arange(len(best)), best]
+
+
+_CANONICAL: Dict[Tuple[str, ...], CanonicalIndex] = {}
+_CANONICAL_LOCK = threading.Lock()
+
+
+def _canonical_index(labels: List[str]) -> Optional[CanonicalIndex]:
+    key = tuple(labels)
+    with _CANONICAL_LOCK:
+        index = _CANONICAL.get(key)
+    if index is None:
+        index = CanonicalIndex(labels)
+        if not index.ready:
+            return None
+        with _CANONICAL_LOCK:
+            _CANONICAL[key] = index
+    return index
+
+
+def embedding_category_mapping(column_name: str, values: list, canonical: List[str],
+                               threshold: float = EMBED_THRESHOLD) -> dict:
+    """
+    Map raw values to canonical categories by nearest-neighbour search over
+    embeddings. Only values whose best similarity is below `threshold` are sent
+    to the LLM (ask_for_category_mapping); without embeddings everything is.
+    Every mapped value is one of `canonical`.
+    """
+    if not values:
+        return {}
+    by_lower = {c.lower(): c for c in canonical}
+    mapping = {v: by_lower[v.strip().lower()] for v in values if v.strip().lower() in by_lower}
+    rest = [v for v in values if v not in mapping]
+
+    unsure = rest
+    index = _canonical_index(canonical) if rest else None
+    if index is not None:
+        vecs = ollama_embed(rest)
+        if vecs.shape[0] == len(rest):
+            labels, sims = index.nearest(vecs)
+            unsure = []
+            for v, label, sim in zip(rest, labels, sims):
+                if sim >= threshold:
+                    mapping[v] = label
+                else:
+                    unsure.append(v)
+
+    # the LLM answers free-form; keep only answers that name a canonical label
+    # (anything else becomes "Other" where the column has one)
+    fallback = by_lower.get("other")
+    for i in range(0, len(unsure), 120):
+        chunk = unsure[i:i + 120]
+        llm = ask_for_category_mapping(column_name, chunk)
+        for k, v in llm.items():
+            if k not in chunk or not isinstance(v, str):
+                continue
+            label = by_lower.get(v.strip().lower(), fallback)
+            if label is not None:
+                mapping[k] = label
+    print(f"[normalize] {column_name}: {len(values) - len(unsure)} by embeddings, {len(unsure)} via LLM")
+    return mapping
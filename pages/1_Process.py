@@ -1,35 +1,53 @@
 import streamlit as st
-from ui_helpers import top_nav, show_csv
-from oci_helpers import load_cloud_csv
-from prep_helpers import DST_MERGED, manual_prepare, ollama_prepare, write_prepared
+from ui_helpers import top_nav, show_cloud_csv, clear_cloud_previews
+from prep_helpers import DST_MERGED, ensure_prepared_in_cloud
 
 st.set_page_config(page_title="Process", page_icon="⚙️", layout="wide")
 
 top_nav()
 st.title("⚙️ Process Merged Data")
 
-merged = load_cloud_csv(DST_MERGED)
-if merged.empty:
+preview = show_cloud_csv(DST_MERGED, "Merged data preview")
+if preview.empty:
     st.error("merged_data.csv not found or empty. Go back to Home to build it.")
     st.stop()
 
-show_csv(merged.head(500), "Merged data preview")
-
 st.divider()
+incremental = st.checkbox(
+    "Only prepare new or changed rows",
+    value=True,
+    help="Reuse the last prepared file of the same kind and only process rows that changed in merged_data.csv",
+)
+partitioned = st.checkbox(
+    "Also write month partitions",
+    value=False,
+    help="Write prep/v=<run>/month=YYYY-MM/part.csv so date-bounded analysis only downloads the months it needs",
+)
+
+
+def _prepare(variant: str) -> str:
+    # single-flight: if another session is already preparing the same input, wait and reuse it
+    df, which = ensure_prepared_in_cloud(variant, incremental, partitioned)
+    st.session_state["prep_variant"] = variant
+    clear_cloud_previews()
+    if df.attrs.get("reused"):
+        st.info("This input was already prepared with these options; reusing the stored result.")
+    inc = df.attrs.get("incremental")
+    if inc:
+        st.info(f"Incremental: {inc['added']} new/changed rows prepared, {inc['kept']} reused, {inc['removed']} removed.")
+    return which
+
+
 c1, c2 = st.columns(2)
 with c1:
     if st.button("🧠 Prepare by Ollama", help="Use local gemma3 to normalize categories", use_container_width=True):
         with st.spinner("Preparing with Ollama (gemma3)..."):
-            df = ollama_prepare(merged)
-            which = write_prepared(df, "ollama")
-            st.session_state["prep_variant"] = "ollama"
+            which = _prepare("ollama")
         st.success(f"Saved {which} and updated prep.csv in cloud.")
 with c2:
     if st.button("🧹 Prepare without Ollama", help="Deterministic cleanup only", use_container_width=True):
         with st.spinner("Preparing manually..."):
-            df = manual_prepare(merged)
-            which = write_prepared(df, "manual")
-            st.session_state["prep_variant"] = "manual"
+            which = _prepare("manual")
         st.success(f"Saved {which} and updated prep.csv in cloud.")
 
 st.divider()
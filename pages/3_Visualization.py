@@ -1,16 +1,22 @@
 # pages/3_Visualization.py
+import json
+import time
 import streamlit as st
-import plotly.graph_objs as go
-from PIL import Image
-
-from ui_helpers import top_nav, show_csv, sidebar_question_picker, QUESTIONS
-from oci_helpers import load_cloud_csv
-from prep_helpers import DST_PREP, DST_UPLOAD
-from viz_helpers import (
-    q1_incident_types, q2_client_groups, q3_when, q4_resolution,
-    q5_org_rates, q6_emotions, q7_reporters, q8_recurrence,
-    q9_actions, q10_text_patterns
-)
+
+from ui_helpers import top_nav, show_csv, sidebar_question_picker, sidebar_filters, QUESTIONS
+from oci_helpers import load_cloud_csv, head_cloud_object
+from prep_helpers import DST_PREP, DST_UPLOAD, PART_PREFIX, PART_INDEX, load_partition_index, load_prepared_range
+from filter_helpers import FilterIndex, dataset_version
+from figstore_helpers import get_figure_store
+from viz_helpers import question_figures, QUESTION_FUNCS, DEDUP_QUESTIONS
+from dedup_helpers import DUP_GROUP
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def _filter_index(version: str, _df) -> FilterIndex:
+    # built once per dataset version and shared by all sessions
+    return FilterIndex(_df)
+
 
 # =========================
 # Page Config
@@ -24,12 +30,52 @@ st.title("📊 Questions & Plots")
 # =========================
 use_uploaded = st.session_state.get("use_uploaded", False)
 csv_name = DST_UPLOAD if use_uploaded else DST_PREP
-df = load_cloud_csv(csv_name)
+index = load_partition_index() if not use_uploaded else None
+dated = index[index["min_date"].notna()] if index is not None and not index.empty else None
+
+if dated is not None and not dated.empty:
+    # month partitions exist: only download the months inside the chosen range
+    lo, hi = dated["min_date"].min().date(), dated["max_date"].max().date()
+    rng = st.sidebar.date_input("Incident dates", value=(lo, hi), min_value=lo, max_value=hi)
+    start, end = rng if isinstance(rng, (tuple, list)) and len(rng) == 2 else (lo, hi)
+    full_range = (start, end) == (lo, hi)
+    df = load_prepared_range() if full_range else load_prepared_range(start, end)
+    csv_name = f"{PART_PREFIX} ({start} → {end})"
+    version_of = PART_INDEX
+else:
+    df = load_cloud_csv(csv_name)
+    version_of = csv_name
 if df.empty:
     st.error(f"{csv_name} not found or empty. Please complete previous steps.")
     st.stop()
 
-st.caption(f"Using: **{csv_name}**")
+# =========================
+# Filters (row-id indexes, built once per dataset version)
+# =========================
+head = head_cloud_object(version_of) or {}
+version = dataset_version(csv_name, head.get("etag"), df)
+fidx = _filter_index(version, df)
+filters, f_start, f_end = sidebar_filters(fidx, with_dates=dated is None or dated.empty)
+
+t0 = time.perf_counter()
+rows = fidx.select(filters, f_start, f_end)
+select_ms = (time.perf_counter() - t0) * 1000
+n_total = len(df)
+if rows is not None:
+    df = df.iloc[rows].reset_index(drop=True)
+st.sidebar.caption(
+    f"{len(df):,} of {n_total:,} rows · selected in {select_ms:.1f} ms · "
+    f"index {fidx.nbytes / 1e6:.2f} MB"
+)
+if df.empty:
+    st.warning("No incidents match the current filters.")
+    st.stop()
+
+mem = df.attrs.get("memory")
+st.caption(
+    f"Using: **{csv_name}**"
+    + (f" · {mem['typed'] / 1e6:.1f} MB in memory (vs {mem['inferred'] / 1e6:.1f} MB inferred)" if mem else "")
+)
 show_csv(df.head(20), "Preview")
 
 # =========================
@@ -40,58 +86,77 @@ short, full = QUESTIONS[q_idx]
 st.subheader(f"Question: {short}")
 st.caption(full)
 
+dedup = False
+if DUP_GROUP in df.columns and QUESTION_FUNCS[q_idx] in DEDUP_QUESTIONS:
+    n_events = df[DUP_GROUP].nunique()
+    dedup = st.sidebar.checkbox(
+        "Count near-duplicate reports once", value=False, key="viz_dedup",
+        help="Reports of the same event by several people (similar description, same client, within a few days)",
+    )
+    if dedup:
+        st.caption(f"De-duplicated: {n_events:,} distinct incidents from {len(df):,} reports")
+
 # =========================
 # Generate Figures
 # =========================
-figs, wc_img = [], None
-if q_idx == 0:
-    figs, wc_img = q1_incident_types(df)
-elif q_idx == 1:
-    figs = q2_client_groups(df)
-elif q_idx == 2:
-    figs = q3_when(df)
-elif q_idx == 3:
-    figs = q4_resolution(df)
-elif q_idx == 4:
-    figs = q5_org_rates(df)
-elif q_idx == 5:
-    figs = q6_emotions(df)
-elif q_idx == 6:
-    figs = q7_reporters(df)
-elif q_idx == 7:
-    figs = q8_recurrence(df)
-elif q_idx == 8:
-    figs = q9_actions(df)
-elif q_idx == 9:
-    figs = q10_text_patterns(df)
+# figures live in the process-wide store, shared by every session viewing the same group
+store = get_figure_store()
+group = f"{version}|{q_idx}|{json.dumps(filters, sort_keys=True)}|{f_start}|{f_end}|{dedup}"
+items = store.get_group(group)
+if items is None:
+    keys = store.put_group(group, question_figures(df, q_idx, dedup=dedup))
+    # only misses if the store is smaller than this one question's figures
+    items = [it for it in (store.get(k) for k in keys) if it is not None]
 
 # =========================
 # Show Figures
 # =========================
 cols = st.columns(2)
-saved_figs = []
 
-for i, fig in enumerate(figs[:4]):
-    with cols[i % 2]:
-        if isinstance(fig, go.Figure):
+for i, (kind, fig) in enumerate(items):
+    target = cols[i % 2] if i < 4 else st.container()  # extras (Q1 word cloud) go full width
+    with target:
+        if kind == "plotly":
             st.plotly_chart(fig, use_container_width=True, key=f"plotly_{i}")
-        elif hasattr(fig, "savefig"):  # Matplotlib figure
-            st.pyplot(fig, key=f"matplotlib_{i}")
-        elif isinstance(fig, Image.Image):  # PIL WordCloud
+        elif kind == "image":  # word cloud
             st.image(fig, caption="Word Cloud", use_column_width=True)
+        else:  # rasterized matplotlib figure
+            st.image(fig, use_column_width=True)
 
-    saved_figs.append((f"fig_{i:02d}.png", fig))
-
-if wc_img is not None:
-    st.image(wc_img, caption="Word Cloud", use_column_width=True)
-    saved_figs.append(("wordcloud.png", wc_img))
+fs = store.stats()
+st.sidebar.caption(
+    f"Figure store: {fs['bytes'] / 1e6:.1f} / {fs['max_bytes'] / 1e6:.0f} MB · "
+    f"{fs['entries']} figures · {fs['evictions']} evicted"
+)
 
 # =========================
 # Pass Context to Recommendations Page
 # =========================
 st.session_state["viz_csv_used"] = csv_name
 st.session_state["viz_question_idx"] = q_idx
-st.session_state["viz_figs"] = saved_figs
+
+# =========================
+# Full Offline Report
+# =========================
+st.divider()
+if st.button("📦 Build full report (all questions)", use_container_width=True):
+    from report_helpers import build_report, publish_report
+
+    with st.spinner("Rendering all questions in parallel..."):
+        if f_start is not None:
+            date_range = (f_start, f_end)
+        elif dated is not None and not dated.empty and not full_range:
+            date_range = (start, end)
+        else:
+            date_range = None
+        data, manifest = build_report(df, csv_name, version, titles=[q[0] for q in QUESTIONS],
+                                      filters=filters, date_range=date_range)
+        obj, link = publish_report(data, version, manifest=manifest)
+    st.success(f"Report saved as '{obj}' ({len(data) / 1e6:.1f} MB, built in {manifest['seconds']} s).")
+    if link:
+        st.markdown(f"[Download report]({link})")
+    else:
+        st.warning("Could not create a share link for the report.")
 
 # =========================
 # Navigation
@@ -1,12 +1,12 @@
 # pages/4_Recommendations.py
 import streamlit as st
 import plotly.graph_objs as go
-from PIL import Image
 
 from ollama_helpers import ollama_generate
 from oci_helpers import load_cloud_csv
 from prep_helpers import DST_PREP
 import viz_helpers
+from viz_helpers import is_pil_image
 from ui_helpers import QUESTIONS
 
 # =========================
@@ -76,7 +76,7 @@ for i, fig in enumerate(figs):
         st.plotly_chart(fig, use_container_width=True, key=f"plotly_{i}")
     elif hasattr(fig, "savefig"):  # Matplotlib
         st.pyplot(fig, key=f"matplotlib_{i}")
-    elif isinstance(fig, Image.Image):  # PIL
+    elif is_pil_image(fig):  # PIL
         st.image(fig, caption="Word Cloud", use_column_width=True)
 
 if wc is not None:  # extra wordcloud for Q1
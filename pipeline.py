@@ -0,0 +1,194 @@
+# pipeline.py
+"""
+Headless batch pipeline: merge -> prepare -> report -> publish, without Streamlit.
+
+    python pipeline.py                              # merge + manual prepare
+    python pipeline.py --prepare ollama --report --publish
+    python pipeline.py --config nightly.toml --dry-run
+
+Configuration comes from the environment (same variables as the app, e.g.
+OCI_NAMESPACE, OCI_BUCKET, OCI_USER_OCID..., OLLAMA_ENDPOINTS, MERGE_JOIN_POLICY)
+or from a JSON/TOML file with an optional [env] table (exported before anything
+is imported, existing environment wins) and a [pipeline] table with the options
+below. Command-line flags override the file.
+
+Exit codes: 0 ok, 1 a stage failed, 2 bad usage or configuration.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+EXIT_OK, EXIT_FAILED, EXIT_CONFIG = 0, 1, 2
+
+DEFAULTS = {
+    "prepare": "manual",       # manual | ollama | none
+    "incremental": True,
+    "partitioned": False,
+    "report": False,
+    "publish": False,
+    "report_out": "",          # local path for the report zip when not publishing
+    "share_days": 7,
+}
+
+
+def _load_config(path: str) -> dict:
+    with open(path, "rb") as f:
+        if path.endswith(".toml"):
+            import tomllib
+            return tomllib.load(f)
+        return json.load(f)
+
+
+def _parse_args(argv) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Run the incident data pipeline without Streamlit.")
+    ap.add_argument("--config", help="JSON or TOML file with [env] and [pipeline] tables")
+    ap.add_argument("--prepare", choices=["manual", "ollama", "none"], help="preparation variant (default manual)")
+    ap.add_argument("--full", action="store_true", help="re-prepare every row instead of only new/changed ones")
+    ap.add_argument("--partitioned", action="store_true", default=None, help="also write month partitions")
+    ap.add_argument("--report", action="store_true", default=None, help="render the ten-question report")
+    ap.add_argument("--publish", action="store_true", default=None, help="upload the report and print a share link")
+    ap.add_argument("--report-out", help="write the report zip to this local path")
+    ap.add_argument("--share-days", type=int, help="share link lifetime in days")
+    ap.add_argument("--dry-run", action="store_true", help="show the plan and check inputs, write nothing")
+    return ap.parse_args(argv)
+
+
+def _options(args: argparse.Namespace, file_cfg: dict) -> dict:
+    opts = dict(DEFAULTS)
+    opts.update(file_cfg.get("pipeline", {}))
+    if args.prepare:
+        opts["prepare"] = args.prepare
+    if args.full:
+        opts["incremental"] = False
+    for key in ["partitioned", "report", "publish", "report_out", "share_days"]:
+        val = getattr(args, key)
+        if val is not None:
+            opts[key] = val
+    if opts["prepare"] not in ("manual", "ollama", "none"):
+        raise ValueError(f"prepare must be manual, ollama or none (got {opts['prepare']!r})")
+    if opts["publish"]:
+        opts["report"] = True
+    if opts["report"] and opts["prepare"] == "none":
+        raise ValueError("--report needs a prepare step")
+    return opts
+
+
+def _stage(name: str, fn: Callable, timings: Dict[str, float]):
+    print(f"[{name}] started")
+    t0 = time.perf_counter()
+    result = fn()
+    timings[name] = round(time.perf_counter() - t0, 2)
+    print(f"[{name}] done in {timings[name]:.2f} s")
+    return result
+
+
+def _check_cloud() -> Optional[str]:
+    """Build the Object Storage client once up front; the error text if the SDK or its config is missing."""
+    from oci_helpers import get_location, get_oci_client
+
+    try:
+        get_oci_client()
+        get_location()
+    except Exception as e:
+        return f"cannot create the OCI client: {type(e).__name__}: {e}"
+    return None
+
+
+def _dry_run(opts: dict) -> int:
+    from oci_helpers import get_location, head_cloud_object
+    from prep_helpers import SRC_FINAL, SRC_MAIN, SRC_REP, DST_MERGED, prepared_object
+
+    namespace, bucket = get_location()
+    print(f"[dry-run] bucket {namespace}/{bucket}")
+    missing = False
+    for obj in [SRC_FINAL, SRC_MAIN, SRC_REP]:
+        head = head_cloud_object(obj)
+        print(f"[dry-run]   input {obj}: " + (f"{head['size']} bytes, etag {head['etag']}" if head else "MISSING"))
+        missing |= head is None
+    plan = [f"merge -> {DST_MERGED}"]
+    if opts["prepare"] != "none":
+        kind = "incremental" if opts["incremental"] else "full"
+        plan.append(f"prepare ({opts['prepare']}, {kind}) -> {prepared_object(opts['prepare'])}, prep.csv"
+                    + (", prep/v=*/month=*" if opts["partitioned"] else ""))
+    if opts["report"]:
+        plan.append("report (all questions)" + (" -> publish + share link" if opts["publish"] else ""))
+    for step in plan:
+        print(f"[dry-run] would run: {step}")
+    return EXIT_FAILED if missing else EXIT_OK
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    try:
+        file_cfg = _load_config(args.config) if args.config else {}
+        for key, val in file_cfg.get("env", {}).items():
+            os.environ.setdefault(key, str(val))
+        opts = _options(args, file_cfg)
+    except Exception as e:
+        print(f"[config] {e}", file=sys.stderr)
+        return EXIT_CONFIG
+
+    # helpers read their settings from the environment at import time
+    try:
+        from prep_helpers import DST_PREP, ensure_merged_in_cloud, ensure_prepared_in_cloud
+    except ImportError as e:
+        print(f"[config] {e}", file=sys.stderr)
+        return EXIT_CONFIG
+
+    # without the SDK or credentials every read would quietly come back empty
+    problem = _check_cloud()
+    if problem:
+        print(f"[config] {problem}", file=sys.stderr)
+        return EXIT_CONFIG
+
+    if args.dry_run:
+        return _dry_run(opts)
+
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    try:
+        merged = _stage("merge", ensure_merged_in_cloud, timings)
+        print(f"[merge] {len(merged)} rows" + (" (reused)" if merged.attrs.get("reused") else ""))
+        if merged.empty:
+            raise RuntimeError("merged dataset is empty")
+
+        prepared: Optional[object] = None
+        if opts["prepare"] != "none":
+            prepared, which = _stage(
+                "prepare",
+                lambda: ensure_prepared_in_cloud(opts["prepare"], opts["incremental"], opts["partitioned"]),
+                timings,
+            )
+            print(f"[prepare] {len(prepared)} rows -> {which}" + (" (reused)" if prepared.attrs.get("reused") else ""))
+
+        if opts["report"]:
+            from oci_helpers import head_cloud_object
+            from report_helpers import build_report, publish_report
+
+            version = (head_cloud_object(DST_PREP) or {}).get("etag") or "unknown"
+            data, manifest = _stage("report", lambda: build_report(prepared, DST_PREP, version), timings)
+            print(f"[report] {len(data) / 1e6:.1f} MB, {sum(len(q['files']) for q in manifest['questions'])} files")
+            if opts["report_out"]:
+                with open(opts["report_out"], "wb") as f:
+                    f.write(data)
+                print(f"[report] written to {opts['report_out']}")
+            if opts["publish"]:
+                obj, link = _stage("publish", lambda: publish_report(data, version, opts["share_days"]), timings)
+                print(f"[publish] {obj}")
+                print(f"[publish] link: {link}" if link else "[publish] could not create a share link")
+                if not link:
+                    return EXIT_FAILED
+    except Exception as e:
+        print(f"[pipeline] failed: {type(e).__name__}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    finally:
+        timings["total"] = round(time.perf_counter() - t0, 2)
+        print("[timings] " + json.dumps(timings))
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
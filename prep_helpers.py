@@ -1,11 +1,22 @@
 # prep_helpers.py
-from typing import List
+import hashlib
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 import numpy as np
 import pandas as pd
 from dateutil import parser
 
-from oci_helpers import load_cloud_csv, upload_cloud_csv
-from ollama_helpers import ask_for_category_mapping
+from oci_helpers import (
+    load_cloud_csv, upload_cloud_csv, list_objects, delete_cloud_object, head_cloud_object,
+    CSV_SCHEMAS, STRING_DTYPE, DATETIME_DTYPE,
+)
+from dedup_helpers import DUP_GROUP, near_duplicate_groups
+from lease_helpers import lease_guard
+from entity_helpers import ENTITY_COLUMNS, ENTITY_RESOLUTION, ENTITY_THRESHOLD, resolve_entities
 
 # =========================
 # Cloud object names
@@ -20,12 +31,97 @@ DST_MANUAL = "manual_prepared.csv"
 DST_PREP   = "prep.csv"
 DST_UPLOAD = "upload_prep.csv"
 
+# month-partitioned copy of prep.csv: prep/v=<run>/month=YYYY-MM/part.csv + prep/_index.csv,
+# every run under its own version prefix, so the index only ever points at one complete set
+PART_PREFIX = "prep/"
+PART_INDEX  = PART_PREFIX + "_index.csv"
+PART_UNKNOWN = "unknown"
+PART_WORKERS = int(os.getenv("PREP_PARTITION_WORKERS", "8"))
+
+# What to do when a dimension table (main.csv / reporter.csv) has duplicate join keys:
+#   "fail"      -> raise instead of fanning out the fact table
+#   "first"     -> keep the first row per key
+#   "aggregate" -> collapse duplicates into one row (distinct values joined with "; ")
+JOIN_POLICY = os.getenv("MERGE_JOIN_POLICY", "first")
+JOIN_POLICIES = ("fail", "first", "aggregate")
+
+# How ollama_prepare normalizes categories: "embedding" (nearest canonical label,
+# LLM only for low-confidence values) or "llm" (one free-form mapping call per column).
+OLLAMA_NORMALIZER = os.getenv("OLLAMA_NORMALIZER", "embedding")
+CANONICAL_CATEGORIES = {
+    "severity": ["Low", "Medium", "High", "Critical"],
+    "incident_type": [
+        "Injury", "Fall", "Abuse", "Neglect", "Assault", "Sexual misconduct",
+        "Unauthorised restrictive practice", "Medication error", "Behavioural incident",
+        "Self-harm", "Missing person", "Property damage", "Death", "Other",
+    ],
+    "actions_taken": [
+        "First aid provided", "Medical attention sought", "Emergency services called",
+        "Police notified", "Family or guardian notified", "Incident reported to NDIS Commission",
+        "Behaviour support plan reviewed", "Staff debriefed", "Increased supervision",
+        "Medication reviewed", "No action required", "Other",
+    ],
+}
+
+# look-back windows (days) for recurrence_<w>d columns
+RECURRENCE_WINDOWS = [int(w) for w in os.getenv("RECURRENCE_WINDOWS", "7,30,90").split(",") if w.strip()]
+
+# stable content hash of the merged row a prepared row came from (used by incremental prepare)
+ROW_HASH = "row_hash"
+
+# user metadata key tying a merged/prepared object to the inputs it was built from
+FINGERPRINT_META = "fingerprint"
+
+
+# =========================
+# Column dtypes per object (see oci_helpers.load_cloud_csv)
+# =========================
+SOURCE_SCHEMA = {
+    # identifiers and free text -> Arrow-backed strings
+    "filename": STRING_DTYPE, "client_name": STRING_DTYPE, "ndis_id": STRING_DTYPE,
+    "organization": STRING_DTYPE, "reporter": STRING_DTYPE, "description": STRING_DTYPE,
+    "incident_type": STRING_DTYPE, "actions_taken": STRING_DTYPE, "resolution_time": STRING_DTYPE,
+    # raw dates/times stay text: manual_prepare parses them fuzzily
+    "incident_date": STRING_DTYPE, "incident_time": STRING_DTYPE,
+    "reported_date": STRING_DTYPE, "dob": STRING_DTYPE,
+    # low-cardinality labels
+    "severity": "category", "emotion": "category",
+    "recurrence": "Int32",
+    # canonical entity ids (see entity_helpers)
+    **{f"{c}_id": STRING_DTYPE for c in ENTITY_COLUMNS},
+}
+
+PREP_SCHEMA = {
+    **SOURCE_SCHEMA,
+    "incident_dt": DATETIME_DTYPE, "reported_dt": DATETIME_DTYPE,
+    "incident_hour": "Int8", "year": "Int16", "month": STRING_DTYPE,
+    "dow": "category", "age_years": "float32", "age_group": "category",
+    "severity_norm": "category", "emotion_norm": "category",
+    "resolution_hours": "float32",
+    "incident_type_norm_llm": STRING_DTYPE, "actions_taken_norm_llm": STRING_DTYPE,
+    "severity_norm_llm": "category",
+    ROW_HASH: STRING_DTYPE, DUP_GROUP: STRING_DTYPE,
+    **{f"recurrence_{w}d": "Int32" for w in RECURRENCE_WINDOWS},
+}
+
+CSV_SCHEMAS.update({
+    SRC_FINAL: SOURCE_SCHEMA, SRC_MAIN: SOURCE_SCHEMA, SRC_REP: SOURCE_SCHEMA,
+    DST_MERGED: SOURCE_SCHEMA,
+    DST_OLLAMA: PREP_SCHEMA, DST_MANUAL: PREP_SCHEMA, DST_PREP: PREP_SCHEMA, DST_UPLOAD: PREP_SCHEMA,
+    PART_PREFIX: PREP_SCHEMA,
+})
+
 
 # ---------- helpers ----------
 def _best_key(df: pd.DataFrame, candidates: List[str]) -> List[str]:
     return [c for c in candidates if c in df.columns]
 
 
+def _entity_keys(candidates: List[str], df: pd.DataFrame) -> List[str]:
+    """Join on resolved entity ids instead of raw names where they exist."""
+    return [f"{c}_id" if f"{c}_id" in df.columns else c for c in candidates]
+
+
 def _safe_dt(x):
     """Robust date parser with fuzzy matching."""
     if pd.isna(x):
@@ -49,8 +145,150 @@ def _to_naive(x):
             return x
 
 
+def _join_distinct(s: pd.Series):
+    vals = s.dropna().unique()
+    if len(vals) == 0:
+        return pd.NA
+    if len(vals) == 1:
+        return vals[0]
+    return "; ".join(sorted(str(v) for v in vals))
+
+
+def _key_index(df: pd.DataFrame, on: List[str]) -> pd.Index:
+    return pd.Index(df[on[0]]) if len(on) == 1 else pd.MultiIndex.from_frame(df[on])
+
+
+def _estimate_join_rows(fact: pd.DataFrame, dim: pd.DataFrame, on: List[str]) -> int:
+    """Rows a left join would produce: each fact row matches max(1, #dim rows with its key)."""
+    counts = dim.groupby(on, dropna=False).size()
+    matched = counts.reindex(_key_index(fact, on)).fillna(1).clip(lower=1)
+    return int(matched.sum())
+
+
+def _prepare_dimension(dim: pd.DataFrame, on: List[str], policy: str, name: str,
+                       fact: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    De-duplicate a dimension table on its join keys and index it by them.
+    Under the "fail" policy only duplicate keys that rows of `fact` reference
+    (all of them without `fact`) are an error; the others cannot fan out.
+    """
+    if policy not in JOIN_POLICIES:
+        raise ValueError(f"Unknown join policy '{policy}', expected one of {JOIN_POLICIES}")
+    dup = dim.duplicated(subset=on, keep=False)
+    if policy == "fail" and dup.any() and fact is not None:
+        dup &= _key_index(dim, on).isin(_key_index(fact, on))
+    if dup.any():
+        n_keys = dim.loc[dup, on].drop_duplicates().shape[0]
+        if policy == "fail":
+            raise ValueError(
+                f"{name}: {n_keys} duplicate key(s) on {on} ({int(dup.sum())} rows) "
+                f"would fan out the merge; fix the source or set MERGE_JOIN_POLICY"
+            )
+        if policy == "first":
+            dim = dim.drop_duplicates(subset=on, keep="first")
+        else:
+            dim = dim.groupby(on, dropna=False, sort=False).agg(_join_distinct).reset_index()
+    return dim.set_index(on)
+
+
+def _guarded_join(fact: pd.DataFrame, dim: pd.DataFrame, on: List[str], suffix: str,
+                  policy: str, name: str, report: List[Dict]) -> pd.DataFrame:
+    """Left-join a de-duplicated, pre-indexed dimension and record the fan-out."""
+    rows_in = len(fact)
+    estimated = _estimate_join_rows(fact, dim, on)
+    indexed = _prepare_dimension(dim, on, policy, name, fact)
+    indexed = indexed.rename(columns={c: c + suffix for c in indexed.columns if c in fact.columns})
+    out = fact.join(indexed, on=on if len(on) > 1 else on[0], how="left")
+    out.reset_index(drop=True, inplace=True)
+    # a name joined through its entity id is the same canonical name on both sides
+    for c in ENTITY_COLUMNS:
+        if f"{c}_id" in on and c + suffix in out.columns:
+            out[c] = out[c].fillna(out.pop(c + suffix))
+    report.append({
+        "source": name,
+        "on": on,
+        "policy": policy,
+        "rows_in": rows_in,
+        "estimated_rows": estimated,
+        "rows_out": len(out),
+        "fan_out": round(len(out) / rows_in, 3) if rows_in else 1.0,
+    })
+    print(f"[merge] {name} on {on}: {rows_in} -> {len(out)} rows "
+          f"(unguarded estimate {estimated}, policy={policy})")
+    return out
+
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    """
+    Stable per-row content hash (16 hex chars) over the merged columns.
+    Values are hashed as text, with a trailing ".0" dropped, so a CSV round trip
+    or an int column turning float does not change the hash. Identical rows are
+    told apart by their occurrence number (the first copy keeps the plain hash),
+    so every copy is kept, added and removed on its own.
+    """
+    cols = sorted(c for c in df.columns if c != ROW_HASH)
+    norm = df[cols].astype("string").fillna("").replace(r"\.0$", "", regex=True)
+    content = pd.util.hash_pandas_object(norm, index=False)
+    nth = content.groupby(content.to_numpy()).cumcount()
+    copies = pd.util.hash_pandas_object(pd.DataFrame({"h": content, "n": nth}), index=False)
+    return content.where(nth == 0, copies).map("{:016x}".format)
+
+
+def _recurrence_is_derived(df: pd.DataFrame) -> bool:
+    return "recurrence" not in df.columns or df["recurrence"].isna().all()
+
+
+def _recurrence_counts(df: pd.DataFrame) -> pd.Series:
+    return df.groupby(["client_name", "incident_type"], dropna=False)["incident_type"].transform("count")
+
+
+def _window_columns(windows: List[int]) -> List[str]:
+    return [f"recurrence_{w}d" for w in windows]
+
+
+def add_windowed_recurrence(out: pd.DataFrame, windows: Optional[List[int]] = None) -> pd.DataFrame:
+    """
+    Add recurrence_<w>d: how many earlier incidents of the same (client_name,
+    incident_type) happened in the w days before each incident (NA without a date).
+
+    Rows are sorted once on a packed int64 key (group id << 34 | seconds since the
+    earliest incident); each window is then two vectorized searchsorted calls.
+    Defaults to RECURRENCE_WINDOWS.
+    """
+    windows = RECURRENCE_WINDOWS if windows is None else windows
+    if out.empty:
+        for w in windows:
+            out[f"recurrence_{w}d"] = pd.Series(dtype="Int32")
+        return out
+
+    dts = pd.to_datetime(out["incident_dt"], errors="coerce", utc=True)
+    valid = dts.notna().to_numpy()
+    groups = out.groupby(["client_name", "incident_type"], dropna=False, sort=False).ngroup().to_numpy(np.int64)
+    secs = ((dts[valid] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(np.int64)
+    secs = secs - (secs.min() if len(secs) else 0)
+    g = groups[valid] << 34
+    key = g | secs
+    sorted_key = np.sort(key, kind="stable")
+    before = np.searchsorted(sorted_key, key, side="left")  # strictly earlier, same group
+
+    for w in windows:
+        lo = g | np.maximum(secs - w * 86400, 0)
+        counts = np.zeros(len(out), dtype=np.int64)
+        counts[valid] = before - np.searchsorted(sorted_key, lo, side="left")
+        out[f"recurrence_{w}d"] = pd.Series(counts, index=out.index).astype("Int32").mask(~valid)
+    return out
+
+
 # ---------- merge the three CSVs ----------
-def merge_three_sources() -> pd.DataFrame:
+def merge_three_sources(policy: str = JOIN_POLICY, fingerprint: Optional[str] = None) -> pd.DataFrame:
+    """
+    Left-join main.csv and reporter.csv onto final_emotion_ensemble.csv.
+    Client, organization and reporter names are first resolved to canonical
+    entities (see entity_helpers) and joined on their ids.
+    Dimension tables are de-duplicated on their join keys first (see JOIN_POLICY),
+    so the result always has as many rows as the fact table. Per-join stats are
+    kept in df.attrs["merge_report"].
+    """
     f = load_cloud_csv(SRC_FINAL)
     m = load_cloud_csv(SRC_MAIN)
     r = load_cloud_csv(SRC_REP)
@@ -69,21 +307,22 @@ def merge_three_sources() -> pd.DataFrame:
         if inter:
             df.rename(columns=inter, inplace=True)
 
+    # map name variants to canonical names + <col>_id before joining
+    if ENTITY_RESOLUTION:
+        resolve_entities([f, m, r])
+
     # join strategy
     df = f.copy()
+    report: List[Dict] = []
     if not m.empty:
-        on = list(set(_best_key(m, ["filename", "client_name", "ndis_id"])) & set(df.columns))
+        on = [c for c in _best_key(m, _entity_keys(["filename", "client_name", "ndis_id"], m)) if c in df.columns]
         if on:
-            df = df.merge(m, on=on, how="left", suffixes=("", "_m"))
-        elif "client_name" in m.columns and "client_name" in df.columns:
-            df = df.merge(m, on="client_name", how="left", suffixes=("", "_m"))
+            df = _guarded_join(df, m, on, "_m", policy, SRC_MAIN, report)
 
     if not r.empty:
-        on_r = list(set(_best_key(r, ["reporter", "client_name"])) & set(df.columns))
+        on_r = [c for c in _best_key(r, _entity_keys(["reporter", "client_name"], r)) if c in df.columns]
         if on_r:
-            df = df.merge(r, on=on_r, how="left", suffixes=("", "_r"))
-        elif "reporter" in r.columns and "reporter" in df.columns:
-            df = df.merge(r, on="reporter", how="left", suffixes=("", "_r"))
+            df = _guarded_join(df, r, on_r, "_r", policy, SRC_REP, report)
 
     # ensure columns exist
     for col in [
@@ -94,13 +333,16 @@ def merge_three_sources() -> pd.DataFrame:
         if col not in df.columns:
             df[col] = pd.NA
 
-    upload_cloud_csv(DST_MERGED, df)
+    lease_guard()()
+    upload_cloud_csv(DST_MERGED, df, metadata={FINGERPRINT_META: fingerprint} if fingerprint else None)
+    df.attrs["merge_report"] = report
     return df
 
 
 # ---------- manual deterministic preparation ----------
 def manual_prepare(df: pd.DataFrame) -> pd.DataFrame:
     out = df.copy()
+    out[ROW_HASH] = _row_hashes(df)
 
     out["incident_dt"] = out["incident_date"].apply(_safe_dt)
     out["reported_dt"] = out.get("reported_date", pd.Series([pd.NaT] * len(out))).apply(_safe_dt)
@@ -145,10 +387,13 @@ def manual_prepare(df: pd.DataFrame) -> pd.DataFrame:
     )
 
     # recurrence calc if missing
-    if "recurrence" not in out.columns or out["recurrence"].isna().all():
-        grp = out.groupby(["client_name", "incident_type"], dropna=False)["incident_type"].transform("count")
-        out["recurrence"] = grp
+    if _recurrence_is_derived(out):
+        out["recurrence"] = _recurrence_counts(out)
     out["recurrence"] = pd.to_numeric(out["recurrence"], errors="coerce").fillna(0).astype(int)
+    add_windowed_recurrence(out)
+
+    # the same event reported by several people shares one dup_group_id
+    out[DUP_GROUP] = near_duplicate_groups(out, out[ROW_HASH])
 
     # resolution time
     if "resolution_time" in out.columns and not out["resolution_time"].isna().all():
@@ -183,11 +428,18 @@ def manual_prepare(df: pd.DataFrame) -> pd.DataFrame:
 
 
 # ---------- Ollama-assisted preparation ----------
-def ollama_prepare(df: pd.DataFrame) -> pd.DataFrame:
+def ollama_prepare(df: pd.DataFrame, normalizer: str = OLLAMA_NORMALIZER) -> pd.DataFrame:
+    # imported here so the manual path and the Home page never load the Ollama client
+    from ollama_helpers import ask_for_category_mapping, embedding_category_mapping
+
     out = manual_prepare(df)
     for col in ["incident_type", "actions_taken", "severity"]:
-        uniq = sorted([str(v) for v in out[col].dropna().unique()][:120])
-        mapping = ask_for_category_mapping(col, uniq)
+        if normalizer == "embedding":
+            uniq = sorted(str(v) for v in out[col].dropna().unique())
+            mapping = embedding_category_mapping(col, uniq, CANONICAL_CATEGORIES[col])
+        else:
+            uniq = sorted([str(v) for v in out[col].dropna().unique()][:120])
+            mapping = ask_for_category_mapping(col, uniq)
         out[col + "_norm_llm"] = (
             out[col].astype(str).map(lambda x: mapping.get(x, x))
             if mapping else out[col]
@@ -195,17 +447,273 @@ def ollama_prepare(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
+# ---------- incremental preparation ----------
+def _recompute_history(out: pd.DataFrame, mask: pd.Series, derived_recurrence: bool = True):
+    """
+    Recompute history-dependent columns (recurrence, near-duplicate groups) in
+    place, for the rows selected by mask. Both are computed per client, so the
+    mask must cover whole clients.
+    """
+    sub = out.loc[mask]
+    if sub.empty:
+        return
+    if derived_recurrence:
+        out.loc[mask, "recurrence"] = _recurrence_counts(sub).fillna(0).astype(int)
+    windowed = add_windowed_recurrence(sub.copy())
+    for col in _window_columns(RECURRENCE_WINDOWS):
+        out.loc[mask, col] = windowed[col]
+    out.loc[mask, DUP_GROUP] = near_duplicate_groups(sub, sub[ROW_HASH])
+
+
+def incremental_prepare(merged: pd.DataFrame, previous: pd.DataFrame, variant: str = "manual") -> pd.DataFrame:
+    """
+    Prepare only the rows of `merged` whose row hash is not in `previous` (the last
+    prepared dataset of the same variant) and merge them into it. Rows that no
+    longer exist in `merged` are dropped, and history columns are refreshed for
+    the clients touched by added or removed rows only (for all clients when the
+    recurrence windows changed).
+    Falls back to a full prepare when `previous` has no row hashes, or repeated
+    ones (hashed before identical rows got their own hash).
+    """
+    prepare = ollama_prepare if variant == "ollama" else manual_prepare
+    if previous.empty or ROW_HASH not in previous.columns or previous[ROW_HASH].duplicated().any():
+        return prepare(merged)
+
+    hashes = _row_hashes(merged)
+    prev_hashes = previous[ROW_HASH].astype(str)
+    kept = previous[prev_hashes.isin(hashes)].copy()
+    removed = previous[~prev_hashes.isin(hashes)]
+    new_rows = merged[~hashes.isin(prev_hashes)]
+
+    # rows read back from CSV carry their datetimes as text
+    for col in ["incident_dt", "reported_dt"]:
+        if col in kept.columns:
+            kept[col] = pd.to_datetime(kept[col], errors="coerce")
+
+    fresh = prepare(new_rows) if not new_rows.empty else new_rows.iloc[0:0]
+    if not fresh.empty:
+        # hashed within the whole merge: a later copy of an identical row keeps its own hash
+        fresh[ROW_HASH] = hashes[~hashes.isin(prev_hashes)].to_numpy()
+    out = pd.concat([kept, fresh], ignore_index=True)
+
+    # prepared with other recurrence windows or before near-duplicate detection
+    # existed: history columns are recomputed for every client, not just the touched ones
+    prev_windows = {c for c in previous.columns if re.fullmatch(r"recurrence_\d+d", c)}
+    stale = prev_windows != set(_window_columns(RECURRENCE_WINDOWS)) or DUP_GROUP not in previous.columns
+    if stale:
+        out = out.drop(columns=sorted(prev_windows - set(_window_columns(RECURRENCE_WINDOWS))))
+        _recompute_history(out, pd.Series(True, index=out.index), _recurrence_is_derived(merged))
+    elif not (fresh.empty and removed.empty):
+        affected = pd.concat([fresh["client_name"], removed["client_name"]]).unique()
+        _recompute_history(out, out["client_name"].isin(affected), _recurrence_is_derived(merged))
+
+    out.attrs["incremental"] = {"kept": len(kept), "added": len(fresh), "removed": len(removed)}
+    print(f"[prepare:{variant}] incremental: kept {len(kept)}, added {len(fresh)}, removed {len(removed)}")
+    return out
+
+
 # ---------- orchestration ----------
-def ensure_merged_in_cloud() -> pd.DataFrame:
-    return merge_three_sources()
+def _fingerprint(*parts) -> str:
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+def _etag(object_name: str) -> Optional[str]:
+    return (head_cloud_object(object_name) or {}).get("etag")
+
+
+def _load_if_fingerprint(object_name: str, fingerprint: str) -> Optional[pd.DataFrame]:
+    """The stored object if it was built from these exact inputs, else None."""
+    head = head_cloud_object(object_name)
+    if not head or head["meta"].get(FINGERPRINT_META) != fingerprint:
+        return None
+    df = load_cloud_csv(object_name)
+    df.attrs["reused"] = True
+    return df
+
+
+def ensure_merged_in_cloud(policy: str = JOIN_POLICY) -> pd.DataFrame:
+    """
+    Merge once per input fingerprint (source ETags + join policy + entity
+    resolution settings). Concurrent sessions, in this process or another, wait
+    for the running merge and reuse merged_data.csv instead of merging and
+    overwriting it again.
+    """
+    from lease_helpers import run_once
+
+    fp = _fingerprint(_etag(SRC_FINAL), _etag(SRC_MAIN), _etag(SRC_REP), policy,
+                      ENTITY_RESOLUTION and ENTITY_THRESHOLD)
+    return run_once(
+        "merge", fp,
+        lambda: _load_if_fingerprint(DST_MERGED, fp),
+        lambda: merge_three_sources(policy, fingerprint=fp),
+    )
+
+
+# ---------- month partitions ----------
+def _partition_object(version: str, month: str) -> str:
+    return f"{PART_PREFIX}v={version}/month={month}/part.csv"
+
+
+def write_partitions(df: pd.DataFrame, fingerprint: Optional[str] = None) -> pd.DataFrame:
+    """
+    Write df as one object per `month` under a new version prefix (rows without a
+    date go to month=unknown), then the partition index with row counts and
+    min/max incident dates. Partitions are never overwritten and the index is
+    replaced last, so a reader sees either the old set or the new one. Versions
+    older than the replaced index are deleted afterwards; the replaced one stays
+    for readers still holding its index.
+    """
+    guard = lease_guard()
+    version = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+    dts = pd.to_datetime(df["incident_dt"], errors="coerce")
+    key = df["month"].astype(str).where(dts.notna(), PART_UNKNOWN)
+
+    index, jobs = [], []
+    for month, part in df.groupby(key, sort=True):
+        obj = _partition_object(version, month)
+        part_dt = dts.loc[part.index]
+        index.append({"month": month, "object": obj, "rows": len(part),
+                      "min_date": part_dt.min(), "max_date": part_dt.max()})
+        jobs.append((obj, part))
+
+    def _write(obj: str, part: pd.DataFrame):
+        guard()
+        upload_cloud_csv(obj, part)
+
+    with ThreadPoolExecutor(max_workers=PART_WORKERS) as ex:
+        list(ex.map(lambda j: _write(*j), jobs))
+
+    previous = load_cloud_csv(PART_INDEX)
+    index = pd.DataFrame(index, columns=["month", "object", "rows", "min_date", "max_date"])
+    guard()
+    upload_cloud_csv(PART_INDEX, index, metadata={FINGERPRINT_META: fingerprint} if fingerprint else None)
+
+    keep = set(index["object"]) | set(previous.get("object", pd.Series(dtype=object)).astype(str)) | {PART_INDEX}
+    stale = [o for o in list_objects(PART_PREFIX) if o not in keep]
+    if stale:
+        guard()
+        with ThreadPoolExecutor(max_workers=PART_WORKERS) as ex:
+            list(ex.map(delete_cloud_object, stale))
+        print(f"[partitions] removed {len(stale)} object(s) of older versions")
+    return index
+
+
+def load_partition_index() -> pd.DataFrame:
+    index = load_cloud_csv(PART_INDEX)
+    if index.empty:
+        return index
+    for col in ["min_date", "max_date"]:
+        index[col] = pd.to_datetime(index[col], errors="coerce")
+    return index
+
+
+def load_prepared_range(start=None, end=None) -> pd.DataFrame:
+    """
+    Load the prepared dataset for incidents between start and end (inclusive days)
+    by fetching only the overlapping month partitions, concurrently.
+    With no range, every partition (including month=unknown) is loaded.
+    """
+    index = load_partition_index()
+    if index.empty:
+        return pd.DataFrame()
+    present = set(list_objects(PART_PREFIX))
+    index = index[index["object"].isin(present)]
+
+    lo = pd.Timestamp(start) if start is not None else None
+    hi = pd.Timestamp(end) + pd.Timedelta(days=1) if end is not None else None
+    if lo is not None or hi is not None:
+        index = index[index["month"] != PART_UNKNOWN]
+        if lo is not None:
+            index = index[index["max_date"] >= lo]
+        if hi is not None:
+            index = index[index["min_date"] < hi]
+    if index.empty:
+        return pd.DataFrame()
+
+    with ThreadPoolExecutor(max_workers=PART_WORKERS) as ex:
+        parts = list(ex.map(load_cloud_csv, index["object"]))
+    df = pd.concat(parts, ignore_index=True)
+    print(f"[partitions] loaded {len(index)} partition(s), {len(df)} rows")
+
+    if lo is not None or hi is not None:
+        dts = pd.to_datetime(df["incident_dt"], errors="coerce")
+        keep = dts.notna()
+        if lo is not None:
+            keep &= dts >= lo
+        if hi is not None:
+            keep &= dts < hi
+        df = df[keep].reset_index(drop=True)
+    return df
+
+
+def prepared_object(variant: str) -> str:
+    return DST_OLLAMA if variant == "ollama" else DST_MANUAL
 
 
-def write_prepared(df: pd.DataFrame, variant: str) -> str:
-    if variant == "ollama":
-        upload_cloud_csv(DST_OLLAMA, df)
-        upload_cloud_csv(DST_PREP, df)
-        return DST_OLLAMA
+def _publish_prepared(df: pd.DataFrame, partitioned: bool, fingerprint: Optional[str]):
+    """Make df the current prep.csv (and its month partitions, or none)."""
+    guard = lease_guard()
+    guard()
+    upload_cloud_csv(DST_PREP, df, metadata={FINGERPRINT_META: fingerprint} if fingerprint else None)
+    if partitioned:
+        write_partitions(df, fingerprint)
     else:
-        upload_cloud_csv(DST_MANUAL, df)
-        upload_cloud_csv(DST_PREP, df)
-        return DST_MANUAL
+        # partitions would now be stale; readers fall back to prep.csv without an index
+        guard()
+        delete_cloud_object(PART_INDEX)
+
+
+def write_prepared(df: pd.DataFrame, variant: str, partitioned: bool = False,
+                   fingerprint: Optional[str] = None) -> str:
+    which = prepared_object(variant)
+    lease_guard()()
+    upload_cloud_csv(which, df, metadata={FINGERPRINT_META: fingerprint} if fingerprint else None)
+    _publish_prepared(df, partitioned, fingerprint)
+    return which
+
+
+def _is_published(obj: str, fingerprint: str, partitioned: bool) -> bool:
+    """obj, prep.csv and the partition index (present iff partitioned) all carry this fingerprint."""
+    def _fp(name):
+        head = head_cloud_object(name)
+        return None if head is None else head["meta"].get(FINGERPRINT_META, "")
+
+    if _fp(obj) != fingerprint or _fp(DST_PREP) != fingerprint:
+        return False
+    index_fp = _fp(PART_INDEX)
+    return index_fp == fingerprint if partitioned else index_fp is None
+
+
+def ensure_prepared_in_cloud(variant: str, incremental: bool = True,
+                             partitioned: bool = False) -> Tuple[pd.DataFrame, str]:
+    """
+    Prepare merged_data.csv once per (merged ETag, options, recurrence windows).
+    Both variants share one lease because both rewrite prep.csv.
+    Returns (prepared df, object written).
+    """
+    from lease_helpers import run_once
+
+    obj = prepared_object(variant)
+    fp = _fingerprint(_etag(DST_MERGED), variant, incremental, partitioned,
+                      OLLAMA_NORMALIZER if variant == "ollama" else "",
+                      ",".join(str(w) for w in RECURRENCE_WINDOWS))
+
+    def _compute() -> pd.DataFrame:
+        stored = _load_if_fingerprint(obj, fp)
+        if stored is not None:
+            # prepared before, but the other variant has replaced prep.csv since
+            _publish_prepared(stored, partitioned, fp)
+            return stored
+        merged = load_cloud_csv(DST_MERGED)
+        if incremental:
+            df = incremental_prepare(merged, load_cloud_csv(obj), variant)
+        else:
+            df = ollama_prepare(merged) if variant == "ollama" else manual_prepare(merged)
+        write_prepared(df, variant, partitioned, fingerprint=fp)
+        return df
+
+    def _existing() -> Optional[pd.DataFrame]:
+        # read-only: runs without the lease too
+        return _load_if_fingerprint(obj, fp) if _is_published(obj, fp, partitioned) else None
+
+    return run_once("prepare", fp, _existing, _compute), obj
@@ -0,0 +1,159 @@
+# report_helpers.py
+"""
+Batch rendering of all ten questions into one offline report archive.
+
+Every question is rendered in its own worker process: Plotly figures are exported
+to PNG with the bundled kaleido engine (headless, no network) and to HTML that
+loads a single shared plotly.min.js from the archive; matplotlib figures and word
+clouds are saved as PNG. The archive is uploaded to the bucket and shared via a
+pre-authenticated link.
+"""
+import datetime as dt
+import hashlib
+import html
+import io
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+REPORT_PREFIX = "reports/"
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(min(10, os.cpu_count() or 2))))
+REPORT_PNG_SIZE = (1100, 480)
+
+_DF: Optional[pd.DataFrame] = None
+
+
+# ---------- worker side ----------
+def _init_worker(df: pd.DataFrame):
+    """Runs once per worker: keep the dataset in memory instead of shipping it per task."""
+    global _DF
+    _DF = df
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_question(q_idx: int) -> Tuple[int, List[Tuple[str, bytes]], float]:
+    """Render every figure of one question. Returns (q_idx, [(file name, bytes)], seconds)."""
+    import plotly.graph_objects as go
+    from viz_helpers import question_figures, is_pil_image
+
+    t0 = time.perf_counter()
+    files = []
+    for i, fig in enumerate(question_figures(_DF, q_idx)):
+        stem = f"q{q_idx + 1:02d}_{i + 1:02d}"
+        if isinstance(fig, go.Figure):
+            w, h = REPORT_PNG_SIZE
+            files.append((stem + ".png", fig.to_image(format="png", engine="kaleido", width=w, height=h)))
+            files.append((stem + ".html", fig.to_html(full_html=True, include_plotlyjs="plotly.min.js").encode("utf-8")))
+        elif hasattr(fig, "savefig"):  # matplotlib
+            import matplotlib.pyplot as plt
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", bbox_inches="tight")
+            plt.close(fig)
+            files.append((stem + ".png", buf.getvalue()))
+        elif is_pil_image(fig):  # word cloud
+            buf = io.BytesIO()
+            fig.save(buf, format="PNG")
+            files.append((stem + ".png", buf.getvalue()))
+    return q_idx, files, time.perf_counter() - t0
+
+
+# ---------- parent side ----------
+def _scope(manifest: dict) -> str:
+    """Human-readable filters and date range of a report, empty when it covers everything."""
+    parts = [f"{col}: {', '.join(str(v) for v in vals)}" for col, vals in manifest.get("filters", {}).items()]
+    if manifest.get("date_range"):
+        parts.append("dates: {} → {}".format(*manifest["date_range"]))
+    return "; ".join(parts)
+
+
+def _index_html(manifest: dict) -> str:
+    esc = html.escape
+    scope = _scope(manifest)
+    parts = ["<html><head><meta charset='utf-8'><title>Incident report</title></head><body>",
+             f"<h1>Incident report</h1><p>Dataset: {esc(str(manifest['dataset']))} "
+             f"(version {esc(str(manifest['dataset_version']))}), "
+             f"{manifest['rows']} rows, generated {manifest['created']}</p>"]
+    if scope:
+        parts.append(f"<p>Filtered to {esc(scope)}</p>")
+    for q in manifest["questions"]:
+        parts.append(f"<h2>{q['index']}. {esc(str(q['title']))}</h2>")
+        for name in q["files"]:
+            if name.endswith(".png"):
+                page = name[:-4] + ".html"
+                img = f"<img src='{esc(name)}' width='48%'>"
+                parts.append(f"<a href='{esc(page)}'>{img}</a>" if page in q["files"] else img)
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def build_report(df: pd.DataFrame, dataset: str, version: str,
+                 titles: Optional[List[str]] = None, workers: int = REPORT_WORKERS,
+                 filters: Optional[Dict[str, list]] = None, date_range: Optional[tuple] = None) -> Tuple[bytes, dict]:
+    """
+    Render all questions in parallel and return (zip bytes, manifest).
+    `filters` and `date_range` describe how `df` was sliced; they are recorded in
+    the manifest and on the index page.
+    """
+    from plotly.offline import get_plotlyjs
+    from viz_helpers import QUESTION_FUNCS
+
+    t0 = time.perf_counter()
+    n_q = len(QUESTION_FUNCS)
+    ctx = multiprocessing.get_context("spawn")  # no fork of the app server's threads
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, n_q)), mp_context=ctx,
+                             initializer=_init_worker, initargs=(df,)) as ex:
+        results = list(ex.map(_render_question, range(n_q)))
+
+    manifest = {
+        "dataset": dataset,
+        "dataset_version": version,
+        "rows": len(df),
+        "filters": {col: list(vals) for col, vals in (filters or {}).items() if len(vals)},
+        "date_range": [str(d) for d in date_range] if date_range else None,
+        "created": dt.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "questions": [],
+    }
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("plotly.min.js", get_plotlyjs())
+        for q_idx, files, secs in results:
+            title = titles[q_idx] if titles else QUESTION_FUNCS[q_idx].__name__
+            manifest["questions"].append({
+                "index": q_idx + 1, "title": title,
+                "files": [name for name, _ in files], "seconds": round(secs, 2),
+            })
+            for name, data in files:
+                zf.writestr(name, data)
+        manifest["seconds"] = round(time.perf_counter() - t0, 2)
+        zf.writestr("index.html", _index_html(manifest))
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+    return buf.getvalue(), manifest
+
+
+def publish_report(data: bytes, version: str, days: int = 7,
+                   manifest: Optional[dict] = None) -> Tuple[str, Optional[str]]:
+    """
+    Upload a report archive and return (object name, share link or None).
+    A filtered report (per its manifest) gets its date range and a short hash of
+    its filters in the name, so it is not mistaken for the full report.
+    """
+    from oci_helpers import upload_cloud_bytes, create_share_link
+
+    stamp = dt.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    safe_version = "".join(c if c.isalnum() else "-" for c in str(version))[:40].strip("-")
+    scope = ""
+    if manifest and manifest.get("date_range"):
+        scope += "-" + "_".join(manifest["date_range"])
+    if manifest and manifest.get("filters"):
+        key = json.dumps(manifest["filters"], sort_keys=True, default=str)
+        scope += "-f" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+    object_name = f"{REPORT_PREFIX}report-{stamp}-{safe_version}{scope}.zip"
+    upload_cloud_bytes(object_name, data, content_type="application/zip")
+    return object_name, create_share_link(object_name, days=days)
@@ -0,0 +1,96 @@
+# tests/conftest.py
+import io
+import os
+import sys
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _Raw(io.BytesIO):
+    decode_content = True
+
+
+class _Data:
+    def __init__(self, body: bytes):
+        self.raw = _Raw(body)
+        self.content = body
+
+    def close(self):
+        self.raw.close()
+
+
+class _Resp:
+    def __init__(self, headers: dict, body: bytes = b"", status: int = 200):
+        self.headers = headers
+        self.data = _Data(body)
+        self.status = status
+
+
+class FakeBucket:
+    """In-memory stand-in for the ObjectStorageClient calls oci_helpers makes."""
+
+    def __init__(self):
+        self.objects = {}  # name -> (body, headers)
+        self._etags = itertools.count(1)
+        self.puts = []
+
+    def put_object(self, namespace, bucket, name, body, opc_meta=None, content_type=None,
+                   content_encoding=None, if_match=None, if_none_match=None):
+        data = body.read()
+        headers = {"etag": f"etag-{next(self._etags)}", "content-length": str(len(data))}
+        if content_encoding:
+            headers["content-encoding"] = content_encoding
+        for k, v in (opc_meta or {}).items():
+            headers[f"opc-meta-{k}"] = v
+        self.objects[name] = (data, headers)
+        self.puts.append(name)
+        return _Resp(headers)
+
+    def get_object(self, namespace, bucket, name, range=None):
+        if name not in self.objects:
+            raise KeyError(name)
+        data, headers = self.objects[name]
+        if range:
+            lo, hi = (int(x) for x in range.split("=")[1].split("-"))
+            part = data[lo:hi + 1]
+            h = dict(headers, **{"content-range": f"bytes {lo}-{lo + len(part) - 1}/{len(data)}"})
+            return _Resp(h, part, 206)
+        return _Resp(dict(headers), data)
+
+    def head_object(self, namespace, bucket, name):
+        if name not in self.objects:
+            raise KeyError(name)
+        return _Resp(dict(self.objects[name][1]))
+
+    def list_objects(self, namespace, bucket, prefix="", start=None, fields=None):
+        names = sorted(n for n in self.objects if n.startswith(prefix))
+        objects = [SimpleNamespace(name=n) for n in names]
+        return SimpleNamespace(data=SimpleNamespace(objects=objects, next_start_with=None))
+
+    def delete_object(self, namespace, bucket, name, if_match=None):
+        if if_match and self.objects[name][1]["etag"] != if_match:
+            raise KeyError(name)
+        self.objects.pop(name)
+
+    def put_if(self, name, data, if_match=None, if_none_match=None):
+        """oci_helpers.put_cloud_object_if semantics: new ETag, or None if the precondition failed."""
+        cur = self.objects.get(name)
+        if (if_none_match == "*" and cur is not None) or (if_match and (cur is None or cur[1]["etag"] != if_match)):
+            return None
+        return self.put_object("ns", "bucket", name, io.BytesIO(data)).headers["etag"]
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    import oci_helpers
+
+    fake = FakeBucket()
+    monkeypatch.setattr(oci_helpers, "get_oci_client", lambda: (fake, {"region": "test"}))
+    monkeypatch.setattr(oci_helpers, "_LOCATION", ("ns", "bucket"))
+    import lease_helpers
+    monkeypatch.setattr(lease_helpers, "put_cloud_object_if", fake.put_if)
+    return fake
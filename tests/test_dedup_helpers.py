@@ -0,0 +1,22 @@
+# tests/test_dedup_helpers.py
+import numpy as np
+import pandas as pd
+
+from dedup_helpers import components, near_duplicate_groups
+
+
+def test_components_name_each_group_by_its_smallest_member():
+    roots = components(6, np.array([[4, 1], [1, 3], [2, 5]]))
+    assert roots.tolist() == [0, 1, 2, 1, 1, 2]
+    assert components(3, np.empty((0, 2), dtype=np.int64)).tolist() == [0, 1, 2]
+
+
+def test_near_duplicates_share_the_earliest_report_id():
+    text = "client slipped on the wet bathroom floor and hurt the left wrist"
+    df = pd.DataFrame({
+        "client_name": ["Ann", "Ann", "Bo"],
+        "incident_dt": ["2024-01-02", "2024-01-01", "2024-01-01"],
+        "description": [text, text + ".", text],
+    })
+    groups = near_duplicate_groups(df, pd.Series(["r1", "r2", "r3"]))
+    assert groups.tolist() == ["r2", "r2", "r3"]
@@ -0,0 +1,59 @@
+# tests/test_entity_helpers.py
+import pandas as pd
+import pytest
+
+import lease_helpers
+import prep_helpers as ph
+from entity_helpers import ENTITY_MAP, resolve_entities, resolve_entity
+from lease_helpers import LeaseLostError, run_once
+from oci_helpers import upload_cloud_csv
+
+
+def _ids(entity, names):
+    table = resolve_entity(entity, pd.Series(1, index=names))
+    return table.set_index("variant")["entity_id"]
+
+
+def test_documented_person_variants():
+    ids = _ids("client_name", ["John Smith", "SMITH, John", "Mr John Smith", "John Smithe", "Jon Smith"])
+    assert ids[["SMITH, John", "Mr John Smith", "John Smithe"]].eq(ids["John Smith"]).all()
+    assert ids["Jon Smith"] != ids["John Smith"]
+
+
+def test_generic_org_words_only_block():
+    ids = _ids("organization", ["Acme Care Pty Ltd", "ACME CARE", "Acme Group", "Acme Services",
+                                "Acme Services Pty Ltd"])
+    assert ids["Acme Care Pty Ltd"] == ids["ACME CARE"]
+    assert ids["Acme Services"] == ids["Acme Services Pty Ltd"]
+    assert ids["Acme Group"] != ids["Acme Services"]
+
+
+def test_merge_keeps_one_column_per_resolved_name(bucket):
+    upload_cloud_csv(ph.SRC_FINAL, pd.DataFrame({
+        "filename": ["a.pdf", "b.pdf"], "client_name": ["John Smith", "SMITH, John"],
+        "reporter": ["Rita Ng", "Rita Ng"], "description": ["x", "y"],
+    }))
+    upload_cloud_csv(ph.SRC_MAIN, pd.DataFrame({
+        "filename": ["a.pdf", "b.pdf"], "client_name": ["Mr John Smith", "John Smith"], "ndis_id": ["001", "001"],
+    }))
+    upload_cloud_csv(ph.SRC_REP, pd.DataFrame({
+        "reporter": ["NG, Rita"], "client_name": ["John Smith"], "organization": ["Acme"],
+    }))
+    df = ph.merge_three_sources()
+    assert not [c for c in df.columns if c.endswith(("_m", "_r"))]
+    assert df["client_name"].tolist() == ["John Smith", "John Smith"]
+    assert df["ndis_id"].tolist() == ["001", "001"]
+    assert df["organization"].tolist() == ["Acme", "Acme"]
+
+
+def test_lost_merge_lease_leaves_the_entity_map_alone(bucket):
+    frames = [pd.DataFrame({"client_name": ["John Smith", "SMITH, John"]})]
+
+    def compute():
+        lease_helpers._current.get().expires = 0  # taken over while resolving
+        with pytest.raises(LeaseLostError):
+            resolve_entities(frames)
+        return "stopped"
+
+    assert run_once("merge", "fp", lambda: None, compute) == "stopped"
+    assert ENTITY_MAP not in bucket.objects
@@ -0,0 +1,18 @@
+# tests/test_figstore_helpers.py
+import matplotlib
+import plotly.graph_objects as go
+from PIL import Image
+
+from figstore_helpers import FigureStore
+
+matplotlib.use("Agg")
+
+
+def test_kinds_tell_word_clouds_from_rasterized_plots():
+    import matplotlib.pyplot as plt
+
+    store = FigureStore()
+    keys = store.put_group("g", [go.Figure(), plt.figure(), Image.new("RGB", (4, 4))])
+    kinds = [store.get(k)[0] for k in keys]
+    assert kinds == ["plotly", "png", "image"]
+    assert store.get(keys[2])[1].startswith(b"\x89PNG")
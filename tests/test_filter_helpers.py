@@ -0,0 +1,18 @@
+# tests/test_filter_helpers.py
+import pandas as pd
+
+from filter_helpers import dataset_version
+
+
+def test_version_uses_etag_when_known():
+    df = pd.DataFrame({"a": [1, 2]})
+    assert dataset_version("prep.csv", "etag-7", df) == "prep.csv:etag-7:2"
+
+
+def test_version_without_etag_follows_content():
+    df = pd.DataFrame({"organization": ["Acme", "Beta"], "severity_norm": pd.Categorical(["Low", "High"])})
+    edited = df.assign(organization=["Acme", "Gamma"])
+    v = dataset_version("prep.csv", None, df)
+    assert "None" not in v
+    assert v == dataset_version("prep.csv", None, df.copy())
+    assert v != dataset_version("prep.csv", None, edited)
@@ -0,0 +1,78 @@
+# tests/test_lease_helpers.py
+import threading
+import time
+
+import pytest
+
+import lease_helpers
+from lease_helpers import CloudLease, LeaseLostError, lease_guard, run_once, single_flight
+
+
+def test_single_flight_runs_once_for_concurrent_callers():
+    calls, gate = [], threading.Event()
+
+    def work():
+        calls.append(1)
+        gate.wait(1)
+        return 42
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(single_flight("k", work))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join()
+    assert calls == [1] and results == [42] * 5
+
+
+def test_second_lease_waits_until_release(bucket):
+    a, b = CloudLease("x", ttl=60), CloudLease("x", ttl=60)
+    assert a.try_acquire()
+    assert not b.try_acquire()
+    a.release()
+    assert b.try_acquire()
+    b.release()
+
+
+def test_taken_over_lease_refuses_writes(bucket):
+    lease = CloudLease("x", ttl=60)
+    assert lease.try_acquire()
+    lease.check()
+    # someone else took the lease over: the next renewal fails
+    bucket.put_if("locks/x.lease", b"{}", if_match=lease.etag)
+    lease._stop.set()
+    lease._renewer.join()
+    lease._stop.clear()
+    lease._renewer = threading.Thread(target=lease._renew, daemon=True)
+    lease.ttl = 0.03
+    lease._renewer.start()
+    lease._renewer.join(1)
+    with pytest.raises(LeaseLostError):
+        lease.check()
+    lease.release()
+    assert "locks/x.lease" in bucket.objects  # the new holder's lease is left alone
+
+
+def test_expired_lease_refuses_writes(bucket):
+    lease = CloudLease("x", ttl=60)
+    assert lease.try_acquire()
+    lease.expires = time.time() - 1  # no successful renewal within the TTL
+    with pytest.raises(LeaseLostError):
+        lease.check()
+    lease.release()
+
+
+def test_guard_is_bound_to_the_computing_lease(bucket):
+    assert lease_guard()() is None  # outside run_once: no-op
+
+    def compute():
+        guard = lease_guard()
+        guard()
+        lease_helpers._current.get().expires = 0
+        with pytest.raises(LeaseLostError):
+            guard()
+        return "done"
+
+    assert run_once("g", "fp", lambda: None, compute) == "done"
@@ -0,0 +1,45 @@
+# tests/test_merge_policies.py
+import pandas as pd
+import pytest
+
+import prep_helpers as ph
+
+FACT = pd.DataFrame({"reporter": ["Rita", "Sam", "Rita", "Tom"], "n": [1, 2, 3, 4]})
+DIM = pd.DataFrame({"reporter": ["Rita", "Rita", "Sam", "Zed", "Zed"],
+                    "organization": ["Acme", "Beta", "Acme", "Gamma", "Delta"]})
+
+
+def _join(dim, policy):
+    report = []
+    out = ph._guarded_join(FACT.copy(), dim, ["reporter"], "_r", policy, "reporter.csv", report)
+    return out, report[0]
+
+
+def test_fail_policy_raises_for_a_referenced_duplicate():
+    with pytest.raises(ValueError, match="1 duplicate key"):
+        _join(DIM, "fail")
+
+
+def test_fail_policy_ignores_duplicates_no_fact_row_uses():
+    out, rep = _join(DIM[DIM["reporter"] != "Rita"], "fail")
+    assert len(out) == len(FACT)
+    assert rep["estimated_rows"] == rep["rows_out"] == 4
+
+
+def test_first_policy_keeps_the_first_row_per_key():
+    out, rep = _join(DIM, "first")
+    assert out["organization"].fillna("-").tolist() == ["Acme", "Acme", "Acme", "-"]
+    assert rep["rows_out"] == rep["rows_in"] == 4
+    assert rep["estimated_rows"] == 6  # Rita twice x 2 dimension rows, Sam once, Tom unmatched
+    assert rep["fan_out"] == 1.0
+
+
+def test_aggregate_policy_joins_distinct_values():
+    out, rep = _join(DIM, "aggregate")
+    assert out.loc[out["reporter"] == "Rita", "organization"].unique().tolist() == ["Acme; Beta"]
+    assert len(out) == 4 and rep["estimated_rows"] == 6
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="Unknown join policy"):
+        _join(DIM, "sometimes")
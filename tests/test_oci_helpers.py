@@ -0,0 +1,80 @@
+# tests/test_oci_helpers.py
+import pandas as pd
+import pytest
+
+import oci_helpers
+from oci_helpers import CSV_SCHEMAS, STRING_DTYPE, load_cloud_csv, upload_cloud_csv, preview_cloud_csv
+
+
+def test_text_columns_keep_leading_zeros_and_missing_values(bucket, monkeypatch):
+    monkeypatch.setitem(CSV_SCHEMAS, "t.csv", {"ndis_id": STRING_DTYPE, "reporter": STRING_DTYPE})
+    src = pd.DataFrame({"ndis_id": ["0042", "0007", None], "reporter": [None, "Bob", "Ann"], "n": [1, 2, 3]})
+    upload_cloud_csv("t.csv", src)
+
+    df = load_cloud_csv("t.csv")
+    assert df["ndis_id"].tolist()[:2] == ["0042", "0007"]
+    assert df["ndis_id"].isna().tolist() == [False, False, True]
+    assert df["reporter"].isna().tolist() == [True, False, False]
+    assert "None" not in df["reporter"].dropna().tolist()
+    assert "nan" not in df["ndis_id"].dropna().tolist()
+
+
+def test_transfer_seconds_leave_out_parse_time(bucket, monkeypatch):
+    import time
+    import pyarrow.csv as pacsv
+
+    upload_cloud_csv("big.csv", pd.DataFrame({"a": range(5000), "b": ["x" * 20] * 5000}))
+    real = pacsv.read_csv
+
+    def slow_parse(*args, **kwargs):
+        time.sleep(0.3)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(pacsv, "read_csv", slow_parse)
+    df = load_cloud_csv("big.csv")
+    assert len(df) == 5000
+    stats = df.attrs["transfer"]
+    assert stats["ratio"] > 1
+    assert stats["seconds"] < 0.2
+
+
+def _pages(name, n_rows):
+    frames, offset, sizes = [], 0, []
+    while offset is not None:
+        df, offset = preview_cloud_csv(name, n_rows=n_rows, offset=offset)
+        frames.append(df)
+        sizes.append(len(df))
+    return pd.concat(frames, ignore_index=True), sizes
+
+
+SOURCE = pd.DataFrame({
+    "n": range(25),
+    "description": [f"row {i}, \"quoted\"\nsecond line" if i % 7 == 3 else f"row {i}" for i in range(25)],
+})
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_preview_pages_cover_the_object_exactly_once(bucket, monkeypatch, compression):
+    monkeypatch.setattr(oci_helpers, "PREVIEW_CHUNK_BYTES", 16)  # pages span several range reads
+    upload_cloud_csv("p.csv", SOURCE, compression=compression)
+    assert ("content-encoding" in bucket.objects["p.csv"][1]) is (compression == "gzip")
+
+    df, sizes = _pages("p.csv", 10)
+    assert sizes == [10, 10, 5]
+    pd.testing.assert_frame_equal(df, SOURCE)
+
+
+def test_preview_keeps_a_quoted_newline_inside_its_row(bucket):
+    upload_cloud_csv("p.csv", SOURCE, compression="none")
+    first, nxt = preview_cloud_csv("p.csv", n_rows=4)
+    assert first["description"].iloc[3] == 'row 3, "quoted"\nsecond line'
+    second, _ = preview_cloud_csv("p.csv", n_rows=1, offset=nxt)
+    assert second["n"].tolist() == [4]
+
+
+def test_preview_applies_the_object_schema(bucket, monkeypatch):
+    monkeypatch.setitem(CSV_SCHEMAS, "ids.csv", {"ndis_id": STRING_DTYPE})
+    upload_cloud_csv("ids.csv", pd.DataFrame({"ndis_id": ["0042", None, "0100"]}), compression="none")
+    df, nxt = preview_cloud_csv("ids.csv", n_rows=10)
+    assert df["ndis_id"].tolist()[::2] == ["0042", "0100"] and df["ndis_id"].isna().tolist() == [False, True, False]
+    assert nxt is None
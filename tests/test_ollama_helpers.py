@@ -0,0 +1,93 @@
+# tests/test_ollama_helpers.py
+import pytest
+import requests
+
+import ollama_helpers as oh
+
+
+def _http_error(status: int) -> requests.HTTPError:
+    resp = requests.Response()
+    resp.status_code = status
+    return requests.HTTPError(f"{status}", response=resp)
+
+
+@pytest.fixture
+def router():
+    r = oh.OllamaRouter(["http://a", "http://b"])
+    r._health_thread = object()  # no background polling in tests
+    return r
+
+
+@pytest.mark.parametrize("error, down", [
+    (_http_error(404), False),
+    (_http_error(400), False),
+    (ValueError("bad json"), False),
+    (_http_error(503), True),
+    (requests.ConnectionError("refused"), True),
+    (requests.Timeout("slow"), True),
+])
+def test_only_endpoint_failures_take_a_box_out_of_rotation(router, error, down):
+    with pytest.raises(type(error)):
+        with router.lease() as base:
+            raise error
+    ep = next(e for e in router.endpoints if e.base == base)
+    assert ep.healthy is (not down)
+    assert ep.outstanding == 0
+
+
+class _Post:
+    def __init__(self, status: int):
+        self.status, self.calls = status, 0
+
+    def __call__(self, url, json=None, timeout=None, **kw):
+        self.calls += 1
+        resp = requests.Response()
+        resp.status_code = self.status
+        return resp
+
+
+@pytest.fixture
+def single_router(monkeypatch):
+    r = oh.OllamaRouter(["http://a"])
+    monkeypatch.setattr(oh, "get_router", lambda: r)
+    monkeypatch.setattr(oh, "RETRY_DELAY", 0)
+    monkeypatch.setattr(oh, "_EMBED_DOWN_UNTIL", 0.0)
+    return r
+
+
+def test_embed_fails_fast_on_client_error_and_remembers_it(single_router, monkeypatch):
+    post = _Post(404)
+    monkeypatch.setattr(oh.requests, "post", post)
+    assert oh.ollama_embed(["a", "b"]).size == 0
+    assert post.calls == 1
+    assert oh.ollama_embed(["c"]).size == 0
+    assert post.calls == 1
+    assert single_router.endpoints[0].healthy
+
+
+def test_embed_pauses_after_retries_run_out(single_router, monkeypatch):
+    post = _Post(500)
+    monkeypatch.setattr(oh.requests, "post", post)
+    assert oh.ollama_embed(["a"]).size == 0
+    assert post.calls == oh.MAX_RETRIES
+    oh.ollama_embed(["a"])
+    assert post.calls == oh.MAX_RETRIES
+
+
+def test_llm_fallback_labels_are_clamped_to_canonical(monkeypatch):
+    monkeypatch.setattr(oh, "_canonical_index", lambda labels: None)
+    monkeypatch.setattr(oh, "ask_for_category_mapping", lambda col, values: {
+        "slipped": "fall", "punch": "Physical violence", "odd": 3, "unknown-key": "Fall",
+    })
+    mapping = oh.embedding_category_mapping("incident_type", ["slipped", "punch", "odd"], ["Fall", "Assault", "Other"])
+    assert mapping == {"slipped": "Fall", "punch": "Other"}
+
+    mapping = oh.embedding_category_mapping("severity", ["slipped", "punch"], ["Low", "High"])
+    assert mapping == {}
+
+
+def test_generate_json_server_error_marks_the_endpoint(single_router, monkeypatch):
+    post = _Post(500)
+    monkeypatch.setattr(oh.requests, "post", post)
+    assert oh._ollama_generate_json("prompt") == {}
+    assert single_router.endpoints[0].failures == post.calls == 2 * oh.MAX_RETRIES
@@ -0,0 +1,86 @@
+# tests/test_pipeline.py
+import json
+
+import pytest
+
+import oci_helpers
+import pipeline
+import prep_helpers as ph
+from oci_helpers import upload_cloud_csv
+from test_prep_helpers import merged_frame
+
+
+def _opts(argv, cfg=None):
+    return pipeline._options(pipeline._parse_args(argv), cfg or {})
+
+
+def test_defaults_and_flags():
+    assert _opts([]) == pipeline.DEFAULTS
+    opts = _opts(["--prepare", "ollama", "--full", "--partitioned", "--publish", "--share-days", "3"])
+    assert opts["prepare"] == "ollama" and opts["incremental"] is False and opts["partitioned"] is True
+    assert opts["publish"] is True and opts["report"] is True and opts["share_days"] == 3
+
+
+def test_flags_override_the_config_file():
+    cfg = {"pipeline": {"prepare": "none", "share_days": 30}}
+    assert _opts([], cfg)["prepare"] == "none"
+    assert _opts(["--prepare", "manual", "--share-days", "1"], cfg)["share_days"] == 1
+
+
+@pytest.mark.parametrize("argv,cfg", [
+    (["--report", "--prepare", "none"], {}),
+    ([], {"pipeline": {"prepare": "fancy"}}),
+])
+def test_invalid_options_exit_with_config_error(tmp_path, argv, cfg):
+    path = tmp_path / "cfg.json"
+    path.write_text(json.dumps(cfg))
+    assert pipeline.main(argv + ["--config", str(path)]) == pipeline.EXIT_CONFIG
+
+
+def test_unreadable_config_file_exits_with_config_error(tmp_path):
+    assert pipeline.main(["--config", str(tmp_path / "missing.toml")]) == pipeline.EXIT_CONFIG
+
+
+@pytest.mark.parametrize("argv", [["--dry-run"], []])
+def test_missing_oci_client_is_a_config_error(monkeypatch, capsys, argv):
+    def _no_sdk():
+        raise ModuleNotFoundError("No module named 'oci'")
+
+    monkeypatch.setattr(oci_helpers, "get_oci_client", _no_sdk)
+    assert pipeline.main(argv) == pipeline.EXIT_CONFIG
+    assert "cannot create the OCI client" in capsys.readouterr().err
+
+
+def test_dry_run_reports_missing_inputs_and_writes_nothing(bucket, capsys):
+    upload_cloud_csv(ph.SRC_FINAL, merged_frame())
+    before = list(bucket.puts)
+    assert pipeline.main(["--dry-run", "--partitioned"]) == pipeline.EXIT_FAILED
+    out = capsys.readouterr().out
+    assert f"input {ph.SRC_MAIN}: MISSING" in out and "prep/v=*/month=*" in out
+    assert bucket.puts == before
+
+
+def test_dry_run_with_all_inputs_succeeds(bucket):
+    for name in [ph.SRC_FINAL, ph.SRC_MAIN, ph.SRC_REP]:
+        upload_cloud_csv(name, merged_frame())
+    before = list(bucket.puts)
+    assert pipeline.main(["--dry-run"]) == pipeline.EXIT_OK
+    assert bucket.puts == before
+
+
+def test_run_merges_and_prepares(bucket):
+    upload_cloud_csv(ph.SRC_FINAL, merged_frame())
+    assert pipeline.main(["--prepare", "manual"]) == pipeline.EXIT_OK
+    assert {ph.DST_MERGED, ph.DST_PREP} <= set(bucket.objects)
+
+
+def test_failing_stage_exits_with_failure(bucket, monkeypatch):
+    def _boom():
+        raise RuntimeError("merge broke")
+
+    monkeypatch.setattr(ph, "ensure_merged_in_cloud", _boom)
+    assert pipeline.main([]) == pipeline.EXIT_FAILED
+
+
+def test_empty_merge_is_a_failure(bucket):
+    assert pipeline.main(["--prepare", "none"]) == pipeline.EXIT_FAILED
@@ -0,0 +1,162 @@
+# tests/test_prep_helpers.py
+import pandas as pd
+import pytest
+
+import prep_helpers as ph
+from oci_helpers import head_cloud_object, load_cloud_csv, upload_cloud_csv
+
+LEASE = "locks/prepare.lease"
+
+
+def merged_frame(n: int = 6) -> pd.DataFrame:
+    return pd.DataFrame({
+        "filename": [f"f{i}.pdf" for i in range(n)],
+        "client_name": ["Ann Lee", "Ann Lee", "Bo Chan", "Bo Chan", "Cy Dow", "Cy Dow"][:n],
+        "organization": ["Acme"] * n,
+        "reporter": ["Rita"] * n,
+        "incident_date": ["2024-01-05", "2024-01-20", "2024-02-03", "2024-02-10", "2024-03-01", ""][:n],
+        "incident_time": ["10:00"] * n,
+        "incident_type": ["Fall", "Fall", "Injury", "Fall", "Injury", "Fall"][:n],
+        "severity": ["high", "low", "med", "high", "low", "critical"][:n],
+        "description": [f"client had an incident number {i} in the garden area" for i in range(n)],
+        "emotion": ["fear"] * n,
+        "actions_taken": ["First aid"] * n,
+        "dob": ["1990-01-01"] * n,
+        "ndis_id": [f"00{i}" for i in range(n)],
+        "recurrence": [pd.NA] * n,
+        "resolution_time": [pd.NA] * n,
+    })
+
+
+@pytest.fixture
+def merged(bucket):
+    upload_cloud_csv(ph.DST_MERGED, merged_frame())
+    return bucket
+
+
+def _fp(name):
+    return (head_cloud_object(name) or {"meta": {}})["meta"].get(ph.FINGERPRINT_META)
+
+
+def test_republish_happens_under_the_lease_and_restores_partitions(merged, monkeypatch):
+    df, obj = ph.ensure_prepared_in_cloud("manual", incremental=False, partitioned=True)
+    fp = _fp(obj)
+    assert _fp(ph.DST_PREP) == fp and _fp(ph.PART_INDEX) == fp
+
+    # the other variant replaced prep.csv and dropped the partitions
+    upload_cloud_csv(ph.DST_PREP, df.head(1), metadata={ph.FINGERPRINT_META: "other"})
+    merged.objects.pop(ph.PART_INDEX)
+
+    writes = []
+    put = merged.put_object
+
+    def recording_put(ns, b, name, body, **kw):
+        writes.append((name, LEASE in merged.objects))
+        return put(ns, b, name, body, **kw)
+
+    monkeypatch.setattr(merged, "put_object", recording_put)
+    monkeypatch.setattr(ph, "manual_prepare", lambda *_: pytest.fail("stored result should be reused"))
+    ph.ensure_prepared_in_cloud("manual", incremental=False, partitioned=True)
+
+    data_writes = [(n, held) for n, held in writes if not n.startswith("locks/")]
+    assert {n for n, _ in data_writes} >= {ph.DST_PREP, ph.PART_INDEX}
+    assert all(held for _, held in data_writes)
+    assert _fp(ph.DST_PREP) == fp and _fp(ph.PART_INDEX) == fp
+    assert len(load_cloud_csv(ph.DST_PREP)) == len(df)
+
+
+def test_published_result_is_reused_without_writes(merged):
+    ph.ensure_prepared_in_cloud("manual", incremental=False, partitioned=False)
+    before = list(merged.puts)
+    df, _ = ph.ensure_prepared_in_cloud("manual", incremental=False, partitioned=False)
+    assert df.attrs.get("reused") and merged.puts == before
+
+
+def _history(df: pd.DataFrame, cols) -> pd.DataFrame:
+    return df.sort_values(ph.ROW_HASH)[[ph.ROW_HASH, *cols]].reset_index(drop=True).astype(str)
+
+
+def test_changed_windows_are_recomputed_for_every_client(monkeypatch):
+    merged = merged_frame()
+    monkeypatch.setattr(ph, "RECURRENCE_WINDOWS", [7])
+    previous = ph.manual_prepare(merged)
+
+    monkeypatch.setattr(ph, "RECURRENCE_WINDOWS", [7, 30])
+    grown = pd.concat([merged, merged_frame(1).assign(filename="new.pdf", client_name="Ann Lee")], ignore_index=True)
+    out = ph.incremental_prepare(grown, previous)
+    full = ph.manual_prepare(grown)
+
+    cols = ["recurrence_7d", "recurrence_30d"]
+    dated = out["incident_dt"].notna()
+    assert out.loc[dated, "recurrence_30d"].notna().all()
+    pd.testing.assert_frame_equal(_history(out, cols), _history(full, cols))
+
+
+def test_dropped_window_columns_disappear(monkeypatch):
+    monkeypatch.setattr(ph, "RECURRENCE_WINDOWS", [7, 90])
+    previous = ph.manual_prepare(merged_frame())
+    monkeypatch.setattr(ph, "RECURRENCE_WINDOWS", [7])
+    out = ph.incremental_prepare(merged_frame(), previous)
+    assert "recurrence_90d" not in out.columns and "recurrence_7d" in out.columns
+
+
+def test_windows_are_part_of_the_prepare_fingerprint(merged, monkeypatch):
+    monkeypatch.setattr(ph, "RECURRENCE_WINDOWS", [7])
+    _, obj = ph.ensure_prepared_in_cloud("manual", incremental=False)
+    first = _fp(obj)
+    monkeypatch.setattr(ph, "RECURRENCE_WINDOWS", [7, 30])
+    df, _ = ph.ensure_prepared_in_cloud("manual", incremental=False)
+    assert _fp(obj) != first and not df.attrs.get("reused") and "recurrence_30d" in df.columns
+
+
+@pytest.mark.parametrize("before,after", [(2, 3), (3, 1)])
+def test_identical_rows_survive_incremental_runs(before, after):
+    base = merged_frame()
+    previous = ph.manual_prepare(pd.concat([base] + [base.iloc[[0]]] * (before - 1), ignore_index=True))
+    grown = pd.concat([base] + [base.iloc[[0]]] * (after - 1), ignore_index=True)
+    out = ph.incremental_prepare(grown, previous)
+    full = ph.manual_prepare(grown)
+
+    assert len(out) == len(full) == len(base) + after - 1
+    assert sorted(out[ph.ROW_HASH]) == sorted(full[ph.ROW_HASH])
+    assert out[ph.ROW_HASH].is_unique
+
+
+def test_first_copy_keeps_its_plain_hash():
+    base = merged_frame(2)
+    doubled = pd.concat([base, base.iloc[[0]]], ignore_index=True)
+    assert ph._row_hashes(doubled).iloc[:2].tolist() == ph._row_hashes(base).tolist()
+
+
+def test_load_prepared_range_fetches_only_overlapping_months(bucket, monkeypatch):
+    ph.write_partitions(ph.manual_prepare(merged_frame()))
+    fetched = []
+    get = bucket.get_object
+
+    def recording_get(ns, b, name, **kw):
+        fetched.append(name)
+        return get(ns, b, name, **kw)
+
+    monkeypatch.setattr(bucket, "get_object", recording_get)
+    df = ph.load_prepared_range("2024-02-01", "2024-02-29")
+
+    assert sorted(df["incident_dt"].astype(str).str[:10]) == ["2024-02-03", "2024-02-10"]
+    parts = [n for n in fetched if n != ph.PART_INDEX]
+    assert len(parts) == 1 and "month=2024-02" in parts[0]
+    assert len(ph.load_prepared_range()) == len(merged_frame())  # no range: month=unknown included
+
+
+def test_partition_rewrite_never_touches_the_set_an_old_index_points_at(bucket):
+    prepared = ph.manual_prepare(merged_frame())
+    first = ph.write_partitions(prepared)
+    before = {o: bucket.objects[o][0] for o in first["object"]}
+
+    second = ph.write_partitions(prepared.head(3))
+    assert not set(first["object"]) & set(second["object"])
+    assert {o: bucket.objects[o][0] for o in first["object"]} == before  # old readers still complete
+    assert len(ph.load_prepared_range()) == 3
+
+    third = ph.write_partitions(prepared)
+    names = set(bucket.objects)
+    assert not set(first["object"]) & names
+    assert set(second["object"]) <= names and set(third["object"]) <= names
@@ -0,0 +1,37 @@
+# tests/test_report_helpers.py
+import report_helpers as rh
+
+
+def _manifest(**kw):
+    m = {
+        "dataset": "prep.csv", "dataset_version": "prep.csv:etag-1:10", "rows": 10,
+        "created": "2024-01-01T00:00:00Z", "filters": {}, "date_range": None,
+        "questions": [{"index": 1, "title": "Types <b>& more</b>", "files": ["q01_01.png", "q01_01.html"]}],
+    }
+    m.update(kw)
+    return m
+
+
+def test_index_html_escapes_titles_and_shows_scope():
+    page = rh._index_html(_manifest(filters={"organization": ["A&B <Care>"]},
+                                    date_range=["2024-01-01", "2024-03-31"]))
+    assert "<b>" not in page and "Types &lt;b&gt;&amp; more&lt;/b&gt;" in page
+    assert "A&amp;B &lt;Care&gt;" in page
+    assert "2024-01-01 → 2024-03-31" in page
+    assert "<a href='q01_01.html'><img src='q01_01.png'" in page
+
+
+def test_index_html_without_filters_has_no_scope_line():
+    assert "Filtered to" not in rh._index_html(_manifest())
+
+
+def test_filtered_report_object_name_differs(bucket):
+    full, _ = rh.publish_report(b"zip", "v1", manifest=_manifest())
+    filtered, _ = rh.publish_report(b"zip", "v1", manifest=_manifest(
+        filters={"organization": ["Acme"]}, date_range=["2024-01-01", "2024-03-31"]))
+    other, _ = rh.publish_report(b"zip", "v1", manifest=_manifest(
+        filters={"organization": ["Beta"]}, date_range=["2024-01-01", "2024-03-31"]))
+    assert full.endswith("-v1.zip")
+    assert "-v1-2024-01-01_2024-03-31-f" in filtered
+    assert filtered.rsplit("-f", 1)[1] != other.rsplit("-f", 1)[1]
+    assert {full, filtered, other} <= set(bucket.objects)
@@ -0,0 +1,126 @@
+# tests/test_viz_helpers.py
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import viz_helpers as vz
+
+
+@pytest.fixture
+def prepared():
+    """A prepared-like frame with the compact dtypes load_cloud_csv produces."""
+    sev = pd.Categorical(["Low", "High", "Low", "High"], categories=["Low", "Medium", "High", "Critical"])
+    return pd.DataFrame({
+        "incident_type": ["Fall", "Fall", "Injury", "Injury"],
+        "severity_norm": sev,
+        "organization": ["Acme", "Acme", "Beta", "Beta"],
+        "reporter": ["Ann", "Bob", "Ann", "Bob"],
+        "month": ["2024-01", "2024-01", "2024-02", "2024-02"],
+    })
+
+
+def _trace_names(fig):
+    return {t.name for t in fig.data}
+
+
+@pytest.mark.parametrize("func", [vz.q1_incident_types, vz.q5_org_rates, vz.q7_reporters])
+def test_categorical_groupbys_only_draw_observed_categories(prepared, func):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        res = func(prepared)
+    figs = res[0] if isinstance(res, tuple) else res
+    stacked = [f for f in figs if hasattr(f, "data") and "severity_norm" in str(f.layout.legend.title.text)]
+    assert stacked
+    for fig in stacked:
+        assert _trace_names(fig) <= {"Low", "High", vz.OTHER}
+        assert all(len(t.x) for t in fig.data)
+
+
+def test_top_n_other_keeps_missing_values_missing():
+    s = pd.Series(["a", "a", None, None, None, float("nan"), "b", "c"])
+    out = vz.top_n_other(s, n=1)
+    assert out.isna().sum() == 4
+    assert set(out.dropna()) == {"a", vz.OTHER}
+    assert not {"nan", "None", "<NA>"} & set(out.dropna())
+
+
+def test_top_n_figures_drop_missing_reporters_like_before(prepared):
+    df = prepared.assign(reporter=["Ann", None, None, None])
+    fig = next(f for f in vz.q7_reporters(df) if "organization" in f.layout.title.text)
+    labels = {str(x) for t in fig.data for x in t.x}
+    assert labels == {"Ann"}
+
+
+def test_recurrence_heatmap_uses_fixed_bins():
+    n = 400
+    df = pd.DataFrame({
+        "incident_type": ["Fall"] * n,
+        "recurrence": list(range(n)),
+        "severity_norm": (["Low", "High"] * n)[:n],
+    })
+    fig = next(f for f in vz.q8_recurrence(df) if f.layout.title.text == "Recurrence × severity")
+    assert list(fig.data[0].x) == vz.RECURRENCE_LABELS
+    assert fig.data[0].z.sum() == n
+
+
+def test_dedup_recurrence_keeps_source_recurrence():
+    df = pd.DataFrame({
+        "client_name": ["Ann", "Ann", "Ann", "Bo"],
+        "incident_type": ["Fall", "Fall", "Fall", "Fall"],
+        "recurrence": [7, 7, 7, 2],
+        "dup_group_id": ["g1", "g1", "g2", "g3"],
+    })
+    by_type = vz.q8_recurrence(df.copy())[0]
+    assert list(by_type.data[0].y) == [23]
+    dedup = vz.q8_recurrence(df.copy(), dedup=True)[0]
+    assert dedup.layout.yaxis.title.text == "recurrence_events"
+    assert list(dedup.data[0].y) == [5]  # Ann: 2 events, each counted twice; Bo: 1
+    assert df["recurrence"].tolist() == [7, 7, 7, 2]
+
+
+@pytest.fixture
+def wide():
+    """Many organizations, reporters and clients: every per-entity figure must be capped."""
+    rng = np.random.default_rng(0)
+    n = 20_000
+    clients = rng.integers(0, 3000, n)
+    return pd.DataFrame({
+        "organization": [f"Org {i}" for i in rng.integers(0, 1500, n)],
+        "reporter": [f"Rep {i}" for i in rng.integers(0, 1500, n)],
+        "client_name": [f"Client {i}" for i in clients],
+        "ndis_id": [f"N{i:05d}" for i in clients],
+        "severity_norm": pd.Categorical(rng.choice(["Low", "High"], n), categories=["Low", "Medium", "High"]),
+        "emotion_norm": rng.choice(["fear", "anger"], n),
+        "month": [f"2024-{m:02d}" for m in rng.integers(1, 13, n)],
+        "incident_type": rng.choice(["Fall", "Injury"], n),
+        "actions_taken": [f"Act {i}" for i in rng.integers(0, 500, n)],
+    })
+
+
+@pytest.mark.parametrize("func,title,axis", [
+    (vz.q5_org_rates, "Org trend over time", "organization"),
+    (vz.q5_org_rates, "Severity by organization", "organization"),
+    (vz.q5_org_rates, "Emotion by organization", "organization"),
+    (vz.q6_emotions, "Emotion × organization", "organization"),
+    (vz.q7_reporters, "Reporter × severity", "reporter"),
+    (vz.q9_actions, "Actions × severity", "actions_taken"),
+])
+def test_per_entity_figures_are_capped(wide, func, title, axis):
+    fig = next(f for f in func(wide) if f.layout.title.text == title)
+    assert vz.fig_bytes(fig) <= vz.FIG_BYTE_BUDGET
+    if title == "Org trend over time":
+        names = _trace_names(fig)
+    else:
+        names = {str(x) for t in fig.data for x in t.x}
+    assert len(names) <= vz.MAX_CATEGORIES + 1
+    assert vz.OTHER in names
+
+
+def test_ndis_scatter_is_sampled_and_keeps_other_in_legend(wide):
+    fig = next(f for f in vz.q2_client_groups(wide) if f.layout.title.text == "Rate by NDIS ID")
+    assert vz.fig_bytes(fig) <= vz.FIG_BYTE_BUDGET
+    assert sum(len(t.x) for t in fig.data) <= vz.MAX_POINTS
+    shown = [t.name for t in fig.data if t.showlegend is not False]
+    assert vz.OTHER in shown
@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from oci_helpers import preview_cloud_csv
 
 QUESTIONS = [
     ("Common incident types",
@@ -43,6 +44,70 @@ def show_csv(df: pd.DataFrame, caption: str = ""):
         st.caption(caption)
     st.dataframe(df, use_container_width=True, hide_index=True)
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _cloud_page(object_name: str, page_size: int, offset: int):
+    return preview_cloud_csv(object_name, n_rows=page_size, offset=offset)
+
+
+def clear_cloud_previews():
+    """
+    Drop cached preview pages and this session's page offsets. Call it right after
+    an object was rewritten: old byte offsets no longer start a row.
+    """
+    _cloud_page.clear()
+    for key in [k for k in st.session_state
+                if str(k).startswith("_page_") and not str(k).endswith(("_prev", "_next"))]:
+        del st.session_state[key]
+
+
+def _turn_page(key: str, step: int):
+    st.session_state[key] = max(0, st.session_state.get(key, 0) + step)
+
+
+def show_cloud_csv(object_name: str, caption: str = "", page_size: int = 500) -> pd.DataFrame:
+    """
+    Show a cloud CSV one page at a time. Each page is fetched with a Range request
+    starting at the byte offset where the previous page ended, so only the rows on
+    screen are transferred. Returns the rows of the current page.
+    """
+    page_key = f"_page_{object_name}"
+    offsets_key = f"_page_offsets_{object_name}"
+    offsets = st.session_state.setdefault(offsets_key, [0])
+    page = min(st.session_state.get(page_key, 0), len(offsets) - 1)
+
+    df, nxt = _cloud_page(object_name, page_size, offsets[page])
+    if nxt is not None and len(offsets) == page + 1:
+        offsets.append(nxt)
+
+    show_csv(df, f"{caption} — page {page + 1}" if caption else "")
+    c1, c2 = st.columns(2)
+    with c1:
+        st.button("◀ Prev", key=f"{page_key}_prev", disabled=page == 0,
+                  on_click=_turn_page, args=(page_key, -1), use_container_width=True)
+    with c2:
+        st.button("Next ▶", key=f"{page_key}_next", disabled=nxt is None,
+                  on_click=_turn_page, args=(page_key, 1), use_container_width=True)
+    return df
+
+
+def sidebar_filters(fidx, with_dates: bool = True):
+    """Sidebar slice-and-dice widgets for a FilterIndex. Returns (filters, start, end)."""
+    from filter_helpers import FILTER_COLUMNS
+
+    st.sidebar.markdown("### 🔎 Filters")
+    start = end = None
+    bounds = fidx.date_bounds() if with_dates else None
+    if bounds:
+        rng = st.sidebar.date_input("Date range", value=bounds, min_value=bounds[0], max_value=bounds[1], key="flt_dates")
+        if isinstance(rng, (tuple, list)) and len(rng) == 2 and tuple(rng) != tuple(bounds):
+            start, end = rng
+    filters = {}
+    for col, label in FILTER_COLUMNS.items():
+        if col in fidx.values:
+            filters[col] = st.sidebar.multiselect(label, fidx.options(col), key=f"flt_{col}")
+    return filters, start, end
+
+
 def sidebar_question_picker():
     st.sidebar.markdown("### 🧭 Pick a question")
     chosen = st.session_state.get("current_question", 0)
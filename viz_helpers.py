@@ -1,10 +1,28 @@
+import os
+import sys
 from io import BytesIO
-from typing import List, Tuple, Optional
-import matplotlib.pyplot as plt
+from typing import Callable, List, Tuple, Optional, TYPE_CHECKING
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from PIL import Image
-from wordcloud import WordCloud
+import plotly.graph_objects as go
+
+from dedup_helpers import DUP_GROUP, dedup_rows
+
+# wordcloud (and the PIL / matplotlib stack it pulls in) is only needed for
+# Q1 and Q10, so it is imported inside the functions that draw word clouds.
+if TYPE_CHECKING:
+    from PIL import Image
+
+# =====================
+# Payload limits
+# =====================
+MAX_CATEGORIES = int(os.getenv("VIZ_MAX_CATEGORIES", "20"))       # per categorical axis/colour
+MAX_LEGEND = int(os.getenv("VIZ_MAX_LEGEND", str(MAX_CATEGORIES + 1)))  # legend entries per figure (+ Other)
+WEBGL_MIN_POINTS = int(os.getenv("VIZ_WEBGL_MIN_POINTS", "5000"))  # scatter switches to WebGL
+MAX_POINTS = int(os.getenv("VIZ_MAX_POINTS", "2000"))             # scatter points at MAX_CATEGORIES
+FIG_BYTE_BUDGET = int(os.getenv("VIZ_FIG_BYTE_BUDGET", str(512 * 1024)))
+OTHER = "Other"
 
 # =====================
 # Helpers
@@ -23,14 +41,135 @@ def _grid_fig(fig, title: str):
         margin=dict(l=30, r=20, t=50, b=30),
         title=dict(text=title, x=0.02, xanchor="left", y=0.95, font=dict(size=16)),
     )
+    return _cap_legend(fig)
+
+
+def top_n_other(s: pd.Series, n: int = MAX_CATEGORIES, other: str = OTHER) -> pd.Series:
+    """
+    Keep the n most frequent values of s (as text) and bucket the long tail into
+    `other`. Missing values stay missing (NaN), so groupbys keep dropping them.
+    """
+    text = s.astype("string")
+    top = text.value_counts().index[:n]
+    out = text.where(text.isin(top) | text.isna(), other).astype(object)
+    return out.where(text.notna(), np.nan)
+
+
+def _capped_counts(df: pd.DataFrame, capped: List[str], keep: List[str], n: int) -> pd.DataFrame:
+    """Row counts per (capped + keep) columns, each `capped` column cut to its top n values + Other."""
+    t = pd.DataFrame({c: top_n_other(df[c], n) for c in capped}, index=df.index)
+    for c in keep:
+        t[c] = df[c]
+    return t.groupby(capped + keep, observed=True).size().reset_index(name="count")
+
+
+def _cap_legend(fig, max_items: int = MAX_LEGEND):
+    """Hide legend entries past the first max_items traces (they stay plotted and hoverable)."""
+    shown = 0
+    for tr in fig.data:
+        if tr.showlegend is False:
+            continue
+        shown += 1
+        if shown > max_items:
+            tr.showlegend = False
     return fig
 
 
-def wordcloud_from_text(df: pd.DataFrame, text_col: str = "description") -> Optional[Image.Image]:
+def fig_bytes(fig) -> int:
+    """Size of the figure JSON sent to the browser."""
+    return len(fig.to_json())
+
+
+def _within_budget(build: Callable[[int], object], n: int = MAX_CATEGORIES, budget: int = FIG_BYTE_BUDGET):
+    """
+    Build a figure with at most n categories per axis, halving n until the
+    figure JSON fits the byte budget. `build(n)` must return a Plotly figure.
+    """
+    while True:
+        fig = build(n)
+        size = fig_bytes(fig)
+        if size <= budget or n <= 2:
+            if size > budget:
+                print(f"[viz] figure still {size} bytes at n={n} (budget {budget})")
+            return fig
+        n //= 2
+
+
+def is_pil_image(obj) -> bool:
+    """True if obj is a PIL image, without importing PIL when nothing loaded it yet."""
+    mod = sys.modules.get("PIL.Image")
+    return mod is not None and isinstance(obj, mod.Image)
+
+
+# ---------- server-side summaries (payload independent of row count) ----------
+def _numeric(values) -> np.ndarray:
+    return pd.to_numeric(pd.Series(values), errors="coerce").dropna().to_numpy(dtype=float)
+
+
+def _hist_fig(values, nbins: int, xlabel: str):
+    """Histogram binned with NumPy; only bin centres and counts reach the browser."""
+    v = _numeric(values)
+    counts, edges = np.histogram(v, bins=nbins) if len(v) else (np.zeros(0), np.zeros(1))
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges)))
+    fig.update_layout(bargap=0, xaxis_title=xlabel, yaxis_title="count")
+    return fig
+
+
+def _box_stats(v: np.ndarray) -> dict:
+    """Quartiles and Tukey whiskers (1.5 IQR, clipped to the data) of a non-empty array."""
+    q1, med, q3 = np.percentile(v, [25, 50, 75])
+    iqr = q3 - q1
+    return {
+        "q1": q1, "median": med, "q3": q3, "mean": v.mean(),
+        "lowerfence": v[v >= q1 - 1.5 * iqr].min(),
+        "upperfence": v[v <= q3 + 1.5 * iqr].max(),
+    }
+
+
+def _box_fig(groups: dict, axis_title: str, horizontal: bool = False):
+    """One precomputed box per group (name -> values); raw points are never sent."""
+    names, stats = [], []
+    for name, values in groups.items():
+        v = _numeric(values)
+        if len(v):
+            names.append(str(name))
+            stats.append(_box_stats(v))
+    cols = {k: [b[k] for b in stats] for k in ["q1", "median", "q3", "mean", "lowerfence", "upperfence"]}
+    pos = {"y": names, "orientation": "h"} if horizontal else {"x": names}
+    fig = go.Figure(go.Box(boxpoints=False, **pos, **cols))
+    fig.update_layout(**({"xaxis_title": axis_title} if horizontal else {"yaxis_title": axis_title}))
+    return fig
+
+
+def _heatmap_fig(df: pd.DataFrame, x: str, y: str, x_order=None):
+    """2-D count heatmap aggregated with groupby; only the count matrix is sent."""
+    counts = df.groupby([y, x], observed=True).size().unstack(fill_value=0)
+    if x_order is not None:
+        counts = counts.reindex(columns=x_order, fill_value=0)
+    fig = go.Figure(go.Heatmap(z=counts.to_numpy(), x=[str(c) for c in counts.columns],
+                               y=[str(i) for i in counts.index], colorbar=dict(title="count")))
+    fig.update_layout(xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+# fixed recurrence bins [lo, hi) so the heatmap has a bounded number of columns
+RECURRENCE_EDGES = [0, 1, 2, 3, 5, 10, 20, 50, 100, np.inf]
+RECURRENCE_LABELS = ["0", "1", "2", "3-4", "5-9", "10-19", "20-49", "50-99", "100+"]
+
+
+def _recurrence_bins(values) -> pd.Series:
+    numeric = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    return pd.cut(numeric, bins=RECURRENCE_EDGES, labels=RECURRENCE_LABELS, right=False)
+
+
+def wordcloud_from_text(df: pd.DataFrame, text_col: str = "description") -> Optional["Image.Image"]:
     """Generate a WordCloud image from a text column."""
     text = " ".join([str(t) for t in df[text_col].dropna().tolist()]) if _na(df, text_col) else ""
     if not text.strip():
         return None
+    from PIL import Image
+    from wordcloud import WordCloud
+
     wc = WordCloud(width=800, height=400, background_color="black").generate(text)
     img = wc.to_image()
     buf = BytesIO()
@@ -43,7 +182,9 @@ def wordcloud_from_text(df: pd.DataFrame, text_col: str = "description") -> Opti
 # =====================
 
 # 1
-def q1_incident_types(df: pd.DataFrame) -> Tuple[List, Optional[Image.Image]]:
+def q1_incident_types(df: pd.DataFrame, dedup: bool = False) -> Tuple[List, Optional["Image.Image"]]:
+    if dedup:
+        df = dedup_rows(df)
     figs = []
     wc = None
     if _na(df, "incident_type"):
@@ -52,7 +193,7 @@ def q1_incident_types(df: pd.DataFrame) -> Tuple[List, Optional[Image.Image]]:
         figs.append(_grid_fig(px.bar(s, x="incident_type", y="count"), "Incident types (count)"))
         figs.append(_grid_fig(px.pie(s, names="incident_type", values="count"), "Incident types (share)"))
         if _na(df, "severity_norm"):
-            t = df.groupby(["incident_type", "severity_norm"]).size().reset_index(name="count")
+            t = df.groupby(["incident_type", "severity_norm"], observed=True).size().reset_index(name="count")
             figs.append(
                 _grid_fig(
                     px.bar(t, x="incident_type", y="count", color="severity_norm", barmode="stack"),
@@ -60,7 +201,7 @@ def q1_incident_types(df: pd.DataFrame) -> Tuple[List, Optional[Image.Image]]:
                 )
             )
     if _na(df, "month"):
-        ts = df.groupby("month").size().reset_index(name="count")
+        ts = df.groupby("month", observed=True).size().reset_index(name="count")
         figs.append(_grid_fig(px.line(ts, x="month", y="count"), "Incidents per month"))
     wc = wordcloud_from_text(df, "description")
     return figs, wc
@@ -74,13 +215,30 @@ def q2_client_groups(df: pd.DataFrame) -> List:
         s.columns = ["client_name", "count"]
         figs.append(_grid_fig(px.bar(s, x="client_name", y="count"), "Incidents by client (Top 20)"))
         if _na(df, "ndis_id"):
-            rate = df.groupby(["client_name", "ndis_id"]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.scatter(rate, x="ndis_id", y="count", color="client_name"), "Rate by NDIS ID"))
+            rate = df.groupby(["client_name", "ndis_id"], observed=True).size().reset_index(name="count")
+
+            def _scatter(n):
+                # one point per (client, NDIS ID): fewer categories alone does not shrink it,
+                # so the Other points are sampled down to the point budget
+                r = rate.assign(client_name=top_n_other(rate["client_name"], n))
+                other = r["client_name"] == OTHER
+                k = max(0, MAX_POINTS * n // MAX_CATEGORIES - int((~other).sum()))
+                if other.sum() > k:
+                    r = pd.concat([r[~other], r[other].sample(k, random_state=0)]).sort_index()
+                mode = "webgl" if len(r) >= WEBGL_MIN_POINTS else "auto"
+                return px.scatter(r, x="ndis_id", y="count", color="client_name", render_mode=mode)
+
+            figs.append(_grid_fig(_within_budget(_scatter), "Rate by NDIS ID"))
     if _na(df, "recurrence") and _na(df, "client_name"):
-        bx = _grid_fig(px.box(df.dropna(subset=["recurrence"]), x="client_name", y="recurrence"), "Recurrence by client")
-        figs.append(bx)
+        rec = df.dropna(subset=["recurrence"])
+
+        def _box(n):
+            grouped = rec["recurrence"].groupby(top_n_other(rec["client_name"], n), observed=True)
+            return _box_fig({k: g.to_numpy() for k, g in grouped}, "recurrence")
+
+        figs.append(_grid_fig(_within_budget(_box), "Recurrence by client"))
     if _na(df, "age_group") and _na(df, "incident_type"):
-        ct = df.groupby(["age_group", "incident_type"]).size().reset_index(name="count")
+        ct = df.groupby(["age_group", "incident_type"], observed=True).size().reset_index(name="count")
         figs.append(
             _grid_fig(
                 px.density_heatmap(ct, x="age_group", y="incident_type", z="count", nbinsx=6),
@@ -95,12 +253,14 @@ def q3_when(df: pd.DataFrame) -> List:
     figs = []
     if _na(df, "incident_hour"):
         h = df["incident_hour"].dropna().astype(int)
-        hh = pd.DataFrame({"hour": h})
-        figs.append(_grid_fig(px.histogram(hh, x="hour", nbins=24), "Time of day (hour)"))
+        counts = np.bincount(h.clip(0, 23).to_numpy(), minlength=24)
+        hist = go.Figure(go.Bar(x=np.arange(24), y=counts))
+        hist.update_layout(bargap=0, xaxis_title="hour", yaxis_title="count")
+        figs.append(_grid_fig(hist, "Time of day (hour)"))
         if _na(df, "severity_norm"):
-            t = df.dropna(subset=["incident_hour"]).copy()
-            t["incident_hour"] = t["incident_hour"].astype(int)
-            figs.append(_grid_fig(px.density_heatmap(t, x="incident_hour", y="severity_norm"), "Severity over time of day"))
+            t = pd.DataFrame({"incident_hour": h, "severity_norm": df.loc[h.index, "severity_norm"]})
+            figs.append(_grid_fig(_heatmap_fig(t, "incident_hour", "severity_norm", x_order=range(24)),
+                                  "Severity over time of day"))
     if _na(df, "dow"):
         s = (
             df["dow"]
@@ -113,7 +273,7 @@ def q3_when(df: pd.DataFrame) -> List:
         s.columns = ["dow", "count"]
         figs.append(_grid_fig(px.bar(s, x="dow", y="count"), "Day of week"))
     if _na(df, "month"):
-        ts = df.groupby("month").size().reset_index(name="count")
+        ts = df.groupby("month", observed=True).size().reset_index(name="count")
         figs.append(_grid_fig(px.line(ts, x="month", y="count"), "Monthly pattern"))
     return figs
 
@@ -123,33 +283,39 @@ def q4_resolution(df: pd.DataFrame) -> List:
     figs = []
     if "resolution_hours" not in df.columns:
         return figs
-    df["resolution_hours"] = pd.to_numeric(df["resolution_hours"], errors="coerce").fillna(0)
-    figs.append(_grid_fig(px.histogram(df, x="resolution_hours", nbins=20), "Distribution of Resolution Time (hours)"))
-    figs.append(_grid_fig(px.box(df, x="resolution_hours"), "Resolution Time Spread"))
+    hours = pd.to_numeric(df["resolution_hours"], errors="coerce").fillna(0)
+    figs.append(_grid_fig(_hist_fig(hours, 20, "resolution_hours"), "Distribution of Resolution Time (hours)"))
+    figs.append(_grid_fig(_box_fig({"all": hours}, "resolution_hours", horizontal=True), "Resolution Time Spread"))
     return figs
 
 
 # 5
-def q5_org_rates(df: pd.DataFrame) -> List:
+def q5_org_rates(df: pd.DataFrame, dedup: bool = False) -> List:
+    if dedup:
+        df = dedup_rows(df)
     figs = []
     if _na(df, "organization"):
         s = df["organization"].astype(str).value_counts().reset_index()
         s.columns = ["organization", "count"]
         figs.append(_grid_fig(px.bar(s, x="organization", y="count"), "Incidents per organization"))
         if _na(df, "severity_norm"):
-            t = df.groupby(["organization", "severity_norm"]).size().reset_index(name="count")
-            figs.append(
-                _grid_fig(
-                    px.bar(t, x="organization", y="count", color="severity_norm", barmode="stack"),
-                    "Severity by organization",
-                )
-            )
+            def _org_sev(n):
+                t = _capped_counts(df, ["organization"], ["severity_norm"], n)
+                return px.bar(t, x="organization", y="count", color="severity_norm", barmode="stack")
+
+            figs.append(_grid_fig(_within_budget(_org_sev), "Severity by organization"))
         if _na(df, "month"):
-            tt = df.groupby(["month", "organization"]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.line(tt, x="month", y="count", color="organization"), "Org trend over time"))
+            def _org_trend(n):
+                tt = _capped_counts(df, ["organization"], ["month"], n)
+                return px.line(tt, x="month", y="count", color="organization")
+
+            figs.append(_grid_fig(_within_budget(_org_trend), "Org trend over time"))
         if _na(df, "emotion_norm"):
-            e = df.groupby(["organization", "emotion_norm"]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.density_heatmap(e, x="organization", y="emotion_norm", z="count"), "Emotion by organization"))
+            def _org_emotion(n):
+                e = _capped_counts(df, ["organization"], ["emotion_norm"], n)
+                return px.density_heatmap(e, x="organization", y="emotion_norm", z="count")
+
+            figs.append(_grid_fig(_within_budget(_org_emotion), "Emotion by organization"))
     return figs
 
 
@@ -162,13 +328,16 @@ def q6_emotions(df: pd.DataFrame) -> List:
         s.columns = [col, "count"]
         figs.append(_grid_fig(px.pie(s, names=col, values="count"), "Emotion distribution"))
         if _na(df, "incident_type"):
-            t = df.groupby([col, "incident_type"]).size().reset_index(name="count")
+            t = df.groupby([col, "incident_type"], observed=True).size().reset_index(name="count")
             figs.append(_grid_fig(px.bar(t, x="incident_type", y="count", color=col, barmode="stack"), "Emotion × incident type"))
         if _na(df, "organization"):
-            e = df.groupby(["organization", col]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.density_heatmap(e, x="organization", y=col, z="count"), "Emotion × organization"))
+            def _emotion_org(n):
+                e = _capped_counts(df, ["organization"], [col], n)
+                return px.density_heatmap(e, x="organization", y=col, z="count")
+
+            figs.append(_grid_fig(_within_budget(_emotion_org), "Emotion × organization"))
         if _na(df, "month"):
-            tt = df.groupby(["month", col]).size().reset_index(name="count")
+            tt = df.groupby(["month", col], observed=True).size().reset_index(name="count")
             figs.append(_grid_fig(px.line(tt, x="month", y="count", color=col), "Emotion trend over time"))
     return figs
 
@@ -181,35 +350,53 @@ def q7_reporters(df: pd.DataFrame) -> List:
         s.columns = ["reporter", "count"]
         figs.append(_grid_fig(px.bar(s, x="reporter", y="count"), "Reporter activity (Top 30)"))
         if _na(df, "organization"):
-            t = df.groupby(["reporter", "organization"]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.bar(t, x="reporter", y="count", color="organization", barmode="stack"), "Reporter × organization"))
+            def _rep_org(n):
+                t = (
+                    pd.DataFrame({"reporter": top_n_other(df["reporter"], n),
+                                  "organization": top_n_other(df["organization"], n)})
+                    .groupby(["reporter", "organization"], observed=True).size().reset_index(name="count")
+                )
+                return px.bar(t, x="reporter", y="count", color="organization", barmode="stack")
+
+            figs.append(_grid_fig(_within_budget(_rep_org), "Reporter × organization"))
         if _na(df, "severity_norm"):
-            t = df.groupby(["reporter", "severity_norm"]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.bar(t, x="reporter", y="count", color="severity_norm", barmode="stack"), "Reporter × severity"))
+            def _rep_sev(n):
+                t = _capped_counts(df, ["reporter"], ["severity_norm"], n)
+                return px.bar(t, x="reporter", y="count", color="severity_norm", barmode="stack")
+
+            figs.append(_grid_fig(_within_budget(_rep_sev), "Reporter × severity"))
     return figs
 
 
 # 8
-def q8_recurrence(df: pd.DataFrame) -> List:
+def q8_recurrence(df: pd.DataFrame, dedup: bool = False) -> List:
+    rec = "recurrence"
+    if dedup and DUP_GROUP in df.columns and "client_name" in df.columns and "incident_type" in df.columns:
+        # distinct events per client and type, one row per event; a source recurrence stays as is
+        df = dedup_rows(df).copy()
+        rec = "recurrence_events"
+        df[rec] = df.groupby(["client_name", "incident_type"], dropna=False, observed=True)["incident_type"].transform("size")
     figs = []
-    if _na(df, "recurrence") and _na(df, "incident_type"):
-        t = df.groupby("incident_type")["recurrence"].sum().reset_index()
-        figs.append(_grid_fig(px.bar(t, x="incident_type", y="recurrence"), "Recurrence count by type"))
+    if _na(df, rec) and _na(df, "incident_type"):
+        t = df.groupby("incident_type", observed=True)[rec].sum().reset_index()
+        figs.append(_grid_fig(px.bar(t, x="incident_type", y=rec), "Recurrence count by type"))
         if _na(df, "severity_norm"):
-            ht = df.groupby(["recurrence", "severity_norm"]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.density_heatmap(ht, x="recurrence", y="severity_norm", z="count"), "Recurrence × severity"))
+            binned = pd.DataFrame({rec: _recurrence_bins(df[rec]),
+                                   "severity_norm": df["severity_norm"].to_numpy()})
+            figs.append(_grid_fig(_heatmap_fig(binned, rec, "severity_norm", x_order=RECURRENCE_LABELS),
+                                  "Recurrence × severity"))
         if _na(df, "client_name"):
             c = (
-                df.groupby("client_name")["recurrence"]
+                df.groupby("client_name", observed=True)[rec]
                 .sum()
                 .reset_index()
-                .sort_values("recurrence", ascending=False)
+                .sort_values(rec, ascending=False)
                 .head(30)
             )
-            figs.append(_grid_fig(px.bar(c, x="client_name", y="recurrence"), "Recurrence by client (Top 30)"))
+            figs.append(_grid_fig(px.bar(c, x="client_name", y=rec), "Recurrence by client (Top 30)"))
         if _na(df, "month"):
-            ts = df.groupby("month")["recurrence"].sum().reset_index()
-            figs.append(_grid_fig(px.line(ts, x="month", y="recurrence"), "Recurrence over time"))
+            ts = df.groupby("month", observed=True)[rec].sum().reset_index()
+            figs.append(_grid_fig(px.line(ts, x="month", y=rec), "Recurrence over time"))
     return figs
 
 
@@ -222,13 +409,23 @@ def q9_actions(df: pd.DataFrame) -> List:
         s.columns = [col, "count"]
         figs.append(_grid_fig(px.bar(s, x=col, y="count"), "Actions taken (Top 25)"))
         if _na(df, "incident_type"):
-            t = df.groupby([col, "incident_type"]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.bar(t, x=col, y="count", color="incident_type", barmode="stack"), "Actions × incident type"))
+            def _act_type(n):
+                t = (
+                    pd.DataFrame({col: top_n_other(df[col], n),
+                                  "incident_type": top_n_other(df["incident_type"], n)})
+                    .groupby([col, "incident_type"], observed=True).size().reset_index(name="count")
+                )
+                return px.bar(t, x=col, y="count", color="incident_type", barmode="stack")
+
+            figs.append(_grid_fig(_within_budget(_act_type), "Actions × incident type"))
         if _na(df, "severity_norm"):
-            t = df.groupby([col, "severity_norm"]).size().reset_index(name="count")
-            figs.append(_grid_fig(px.bar(t, x=col, y="count", color="severity_norm", barmode="stack"), "Actions × severity"))
+            def _act_sev(n):
+                t = _capped_counts(df, [col], ["severity_norm"], n)
+                return px.bar(t, x=col, y="count", color="severity_norm", barmode="stack")
+
+            figs.append(_grid_fig(_within_budget(_act_sev), "Actions × severity"))
         if _na(df, "resolution_hours"):
-            d = df.groupby(col)["resolution_hours"].median().reset_index()
+            d = df.groupby(col, observed=True)["resolution_hours"].median().reset_index()
             figs.append(_grid_fig(px.bar(d, x=col, y="resolution_hours"), "Median resolution (by action)"))
     return figs
 
@@ -249,9 +446,37 @@ def q10_text_patterns(df: pd.DataFrame) -> List:
     figs.append(_grid_fig(px.bar(freq.head(30), x="word", y="freq"), "Keyword frequency (top 30)"))
 
     # WordCloud image
+    from wordcloud import WordCloud
+
     text = " ".join(text_series)
     wc = WordCloud(width=800, height=400, background_color="black", colormap="viridis").generate(text)
     img = wc.to_image()
     figs.append(img)
 
     return figs
+
+
+# =====================
+# Registry
+# =====================
+QUESTION_FUNCS = [
+    q1_incident_types, q2_client_groups, q3_when, q4_resolution, q5_org_rates,
+    q6_emotions, q7_reporters, q8_recurrence, q9_actions, q10_text_patterns,
+]
+
+
+# questions whose counts can fold near-duplicate reports into one incident
+DEDUP_QUESTIONS = {q1_incident_types, q5_org_rates, q8_recurrence}
+
+
+def question_figures(df: pd.DataFrame, q_idx: int, dedup: bool = False) -> List:
+    """
+    All figures of question q_idx (0-based); Q1's word cloud comes last.
+    With dedup, questions in DEDUP_QUESTIONS count each near-duplicate group once.
+    """
+    func = QUESTION_FUNCS[q_idx]
+    res = func(df, dedup=dedup) if func in DEDUP_QUESTIONS else func(df)
+    if isinstance(res, tuple):
+        figs, wc = res
+        return figs + ([wc] if wc is not None else [])
+    return res